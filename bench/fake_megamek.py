@@ -0,0 +1,50 @@
+"""
+Stand-in for a MegaMek server, so the service can be benchmarked without JVMs.
+
+It accepts the arguments the service passes to MegaMek, plus:
+- `--startup-delay SECONDS`: time before listening (like the JVM starting).
+- `--startup-cpu SECONDS`: CPU time used before listening (like loading classes).
+- `--memory MIB`: memory to allocate and touch, so it shows in the RSS.
+"""
+
+import argparse
+import os
+import socket
+import time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-dedicated", action="store_true")
+    parser.add_argument("-port", type=int, required=True)
+    parser.add_argument("-savegame")
+    parser.add_argument("--startup-delay", type=float, default=0)
+    parser.add_argument("--startup-cpu", type=float, default=0)
+    parser.add_argument("--memory", type=int, default=0)
+    args = parser.parse_args()
+
+    time.sleep(args.startup_delay)
+    end = time.process_time() + args.startup_cpu
+    while time.process_time() < end:
+        pass
+    memory = bytearray(args.memory * 1024 * 1024)
+    # Touching each page makes it resident.
+    for i in range(0, len(memory), 4096):
+        memory[i] = 1
+
+    os.makedirs("logs", exist_ok=True)
+    with socket.create_server(("", args.port), reuse_port=False) as server:
+        with open("logs/megamek.log", "a") as log:
+            log.write(f"Listening on {args.port}\n")
+            log.flush()
+            # What the service waits for to know it's running.
+            print(f"s: hostname = '{socket.gethostname()}' port = {args.port}", flush=True)
+            while True:
+                connection, address = server.accept()
+                log.write(f"Connection from {address}\n")
+                log.flush()
+                connection.close()
+
+
+if __name__ == "__main__":
+    main()
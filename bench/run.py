@@ -0,0 +1,275 @@
+"""
+Benchmark of the service without real MegaMek servers.
+
+Runs the app in this same process with `fake_megamek.py` as the server, opens
+some websocket clients that only listen, and some more that keep creating and
+destroying servers. The results are written as JSON, to compare releases:
+
+    python bench/run.py --listeners 50 --workers 4 --cycles 20 > result.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack, redirect_stdout
+from datetime import datetime
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+from werkzeug.security import generate_password_hash
+
+_FAKE_MEGAMEK = Path(__file__).with_name("fake_megamek.py")
+_USER = "bench"
+_PASSWORD = "bench"
+_LAG_INTERVAL = 0.01
+_RSS_INTERVAL = 0.1
+_WAIT_TIMEOUT = 60
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+Event = dict[str, Any]
+
+
+class Results:
+    """Raw measurements, in seconds unless said otherwise."""
+
+    create_to_running: list[float]
+    destroy_to_removed: list[float]
+    event_fanout: list[float]
+    loop_lag: list[float]
+    rss_bytes: list[int]
+    failures: list[str]
+
+    def __init__(self) -> None:
+        self.create_to_running = []
+        self.destroy_to_removed = []
+        self.event_fanout = []
+        self.loop_lag = []
+        self.rss_bytes = []
+        self.failures = []
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "create_to_running_seconds": _distribution(self.create_to_running),
+            "destroy_to_removed_seconds": _distribution(self.destroy_to_removed),
+            "event_fanout_seconds": _distribution(self.event_fanout),
+            "event_loop_lag_seconds": _distribution(self.loop_lag),
+            "rss_bytes": {
+                "final": self.rss_bytes[-1] if self.rss_bytes else None,
+                "max": max(self.rss_bytes, default=None),
+                # Includes the startup, which the samples may miss.
+                "peak": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            },
+            "failures": len(self.failures),
+            "failure_examples": self.failures[:10],
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--listeners", type=int, default=20, help="clients that only listen")
+    parser.add_argument("--workers", type=int, default=4, help="clients creating servers")
+    parser.add_argument("--cycles", type=int, default=10, help="servers created per worker")
+    parser.add_argument("--hold", type=float, default=0, help="seconds a server is kept")
+    parser.add_argument("--startup-delay", type=float, default=0.5)
+    parser.add_argument("--startup-cpu", type=float, default=0, help="CPU seconds to start")
+    parser.add_argument("--memory", type=int, default=0, help="MiB used by each server")
+    parser.add_argument("--max-concurrent-spawns", type=int)
+    parser.add_argument("--warm-pool", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="file to write (stdout by default)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_path = _write_config(Path(temp_dir), args)
+        # Read when importing the app.
+        os.environ["QUART_MEGAMEK_MULTI_SERVER"] = str(config_path)
+        # The service (and servers through it) log to stdout.
+        with redirect_stdout(sys.stderr):
+            result = asyncio.run(_benchmark(args))
+
+    output = json.dumps(result, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+
+
+def _write_config(directory: Path, args: argparse.Namespace) -> Path:
+    passwords = directory / "passwords.txt"
+    passwords.write_text(f"{_USER} {generate_password_hash(_PASSWORD)}\n")
+    config = {
+        "passwords": str(passwords),
+        "maxServers": args.workers + args.warm_pool,
+        "warmPool": args.warm_pool,
+        "maxConcurrentSpawns": args.max_concurrent_spawns,
+        "servers": {
+            "fake": {
+                "version": "bench",
+                "exe": [
+                    sys.executable,
+                    str(_FAKE_MEGAMEK),
+                    "--startup-delay",
+                    str(args.startup_delay),
+                    "--startup-cpu",
+                    str(args.startup_cpu),
+                    "--memory",
+                    str(args.memory),
+                ],
+                "setup": [{"type": "mkdir", "path": "logs"}],
+                "game": None,
+            }
+        },
+    }
+    path = directory / "config.json"
+    path.write_text(json.dumps(config))
+    return path
+
+
+async def _benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    from megamek_multi_server import app
+
+    results = Results()
+    async with app.test_app() as test_app, AsyncExitStack() as stack:
+        client = test_app.test_client()
+        response = await client.post("/login", form={"username": _USER, "password": _PASSWORD})
+        if response.status_code != 302:
+            raise Exception("Could not log in")
+
+        listeners = []
+        for _ in range(args.listeners):
+            ws = await stack.enter_async_context(client.websocket("/ws"))
+            listeners.append(asyncio.create_task(_listen(ws, results)))
+        workers = [
+            await stack.enter_async_context(client.websocket("/ws")) for _ in range(args.workers)
+        ]
+        probes = [
+            asyncio.create_task(_measure_loop_lag(results)),
+            asyncio.create_task(_measure_rss(results)),
+        ]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(_churn(ws, args, results) for ws in workers))
+        duration = time.perf_counter() - start
+
+        for task in listeners + probes:
+            task.cancel()
+        await asyncio.gather(*listeners, *probes, return_exceptions=True)
+
+    return {
+        "version": _version(),
+        "python": sys.version.split()[0],
+        "parameters": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "duration_seconds": duration,
+        "servers_per_second": len(results.create_to_running) / duration,
+        **results.summary(),
+    }
+
+
+async def _listen(ws: Any, results: Results) -> None:
+    while True:
+        _record_fanout(json.loads(await ws.receive()), results)
+
+
+async def _churn(ws: Any, args: argparse.Namespace, results: Results) -> None:
+    """Creates and destroys servers one after the other."""
+    for _ in range(args.cycles):
+        id = str(uuid4())
+        start = time.perf_counter()
+        await ws.send(json.dumps({"cmd_type": "create_server", "server": "fake", "id": id}))
+        event = await _wait_for(ws, results, lambda e: _is_running(e, id) or _is_error(e, id))
+        if event["event_type"] == "error":
+            # It was refused before being added, so there is nothing to destroy.
+            results.failures.append(event["message"])
+            continue
+        results.create_to_running.append(time.perf_counter() - start)
+
+        await asyncio.sleep(args.hold)
+        start = time.perf_counter()
+        await ws.send(json.dumps({"cmd_type": "destroy_server", "id": id}))
+        await _wait_for(
+            ws, results, lambda e: e["event_type"] == "server_removed" and e["id"] == id
+        )
+        results.destroy_to_removed.append(time.perf_counter() - start)
+
+
+async def _wait_for(ws: Any, results: Results, condition: Callable[[Event], bool]) -> Event:
+    """Receives events until one meets `condition`."""
+    async with asyncio.timeout(_WAIT_TIMEOUT):
+        while True:
+            event = json.loads(await ws.receive())
+            _record_fanout(event, results)
+            if condition(event):
+                return event
+
+
+def _is_running(event: Event, id: str) -> bool:
+    if event["event_type"] == "server_added":
+        # Already running if it comes from the warm pool.
+        return event["info"]["id"] == id and event["info"]["state"] == "running"
+    return (
+        event["event_type"] == "server_state_changed"
+        and event["id"] == id
+        and event["new_state"] == "running"
+    )
+
+
+def _is_error(event: Event, id: str) -> bool:
+    # Errors are broadcast, so only the ones about this server count.
+    return event["event_type"] == "error" and event["extra_data"].get("id") == id
+
+
+def _record_fanout(event: Event, results: Results) -> None:
+    if event.get("seq") is None:
+        # Snapshots and per-client events are not broadcast.
+        return
+    sent = datetime.fromisoformat(event["event_timestamp"])
+    results.event_fanout.append((datetime.now() - sent).total_seconds())
+
+
+async def _measure_loop_lag(results: Results) -> None:
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(_LAG_INTERVAL)
+        results.loop_lag.append(max(0, time.perf_counter() - start - _LAG_INTERVAL))
+
+
+async def _measure_rss(results: Results) -> None:
+    while True:
+        with open("/proc/self/statm") as f:
+            results.rss_bytes.append(int(f.read().split()[1]) * _PAGE_SIZE)
+        await asyncio.sleep(_RSS_INTERVAL)
+
+
+def _distribution(values: list[float]) -> dict[str, float | int | None]:
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float | None:
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else None,
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": ordered[-1] if ordered else None,
+    }
+
+
+def _version() -> str | None:
+    try:
+        return metadata.version("megamek-multi-server")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import asyncio
+import itertools
+import json
 import logging
 import secrets
 from datetime import timedelta
-from typing import cast
 
 from pydantic import RootModel
 from quart import Quart, redirect, render_template, request, session, url_for, websocket
@@ -16,8 +17,11 @@ from quart_auth import (
     Unauthorized,
 )
 
-from .logic import Command, Event
+from .logic import Command, metrics
+from .logic.auth import TooManyAttempts
 from .logic.extension import QuartMegaMek
+from .logic.tracing import TRACER
+from .logic.wire import negotiate
 
 __all__ = ["app"]
 
@@ -28,6 +32,8 @@ app = Quart(__name__)
 app.config.from_prefixed_env()
 app.secret_key = secrets.token_urlsafe(32)
 app.config["SEND_FILE_MAX_AGE_DEFAULT"] = timedelta(seconds=0)
+# Names the track of each websocket in traces.
+_websocket_numbers = itertools.count(1)
 QuartAuth(app)
 QuartMegaMek(app)
 
@@ -51,33 +57,70 @@ async def admin():
         "admin.html",
         name=current_user.auth_id,
         config_options=config_options,
+        tracing=TRACER.enabled,
     )
 
 
 @app.websocket("/ws")
 @login_required
 async def ws() -> None:
+    # Compression (permessage-deflate) is negotiated by the server itself.
+    subprotocol, format = negotiate(websocket.requested_subprotocols)
+    await websocket.accept(subprotocol=subprotocol)
+    metrics.WEBSOCKETS.inc()
     try:
         task = asyncio.ensure_future(_commands(current_user.auth_id))
-        events = QuartMegaMek.events()
-
-        async for event in events:
-            message = cast(Event, event).model_dump_json()
-            await websocket.send(message)
+        events = QuartMegaMek.events(
+            websocket.args.get("since", type=int),
+            journal=websocket.args.get("journal"),
+            stats="stats" in websocket.args,
+        )
+
+        async for message in events:
+            await websocket.send(message.encode(format))
     finally:
+        metrics.WEBSOCKETS.dec()
         task.cancel()
         await task
 
 
 async def _commands(auth_id) -> None:
-    while True:
-        try:
-            message = await websocket.receive()
-            cmd = RootModel[Command].model_validate_json(message)
-            await QuartMegaMek.apply_command(cmd.root, auth_id)
-        except Exception as e:
-            print(e)
-            raise e
+    with TRACER.tagged(f"websocket {next(_websocket_numbers)}", creator=auth_id):
+        while True:
+            try:
+                message = await websocket.receive()
+                cmd = RootModel[Command].model_validate_json(message)
+                with TRACER.span("command", cmd_type=cmd.root.cmd_type.value):
+                    await QuartMegaMek.apply_command(cmd.root, auth_id)
+            except Exception as e:
+                print(e)
+                raise e
+
+
+@app.route("/metrics")
+async def export_metrics():
+    token = QuartMegaMek.metrics_token()
+    authorization = request.headers.get("Authorization", "")
+    has_token = token is not None and secrets.compare_digest(authorization, f"Bearer {token}")
+    if not has_token and not await current_user.is_authenticated:
+        raise Unauthorized()
+    return QuartMegaMek.metrics(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
+@app.route("/trace")
+@login_required
+async def download_trace():
+    """Recent spans, to open with `chrome://tracing` or Perfetto."""
+    if not TRACER.enabled:
+        return "Traces are disabled (see `traceBufferSize`)", 404
+    return (
+        json.dumps(TRACER.export()),
+        200,
+        {
+            "Content-Type": "application/json",
+            "Content-Disposition": "attachment; filename=megamek-trace.json",
+        },
+    )
 
 
 @app.route("/login", methods=["GET", "POST"])
@@ -88,18 +131,23 @@ async def login():
         form = await request.form
         username = form["username"]
         password = form["password"]
-        if _user := _login_user(username, password):
-            if next:
-                del session["next"]
-            return redirect(next or "/")
+        try:
+            user = await _login_user(username, password)
+        except TooManyAttempts:
+            error = "Massa intents. Torna-ho a provar més tard."
         else:
+            if user is not None:
+                if next:
+                    del session["next"]
+                return redirect(next or "/")
             error = "Usuari o contrasenya incorrecte"
 
     return await render_template("login.html", error=error)
 
 
-def _login_user(username: str, password: str) -> AuthUser | None:
-    if not QuartMegaMek.auth().check_password(username=username, password=password):
+async def _login_user(username: str, password: str) -> AuthUser | None:
+    auth = QuartMegaMek.auth()
+    if not await auth.verify(username, password, address=request.remote_addr):
         return None
     user = AuthUser(username)
     login_user(user)
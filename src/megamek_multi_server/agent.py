@@ -0,0 +1,28 @@
+"""
+Runs as an agent of a central conductor (see `AgentConfig`):
+
+    QUART_MEGAMEK_MULTI_SERVER=config.json python -m megamek_multi_server.agent
+"""
+
+from .logic.agent import Agent
+from .logic.config import Config
+from .standalone import run_until_terminated, standalone_conductor
+
+
+async def main() -> None:
+    async with standalone_conductor() as (conductor, config_file):
+        config = config_file.value
+        if config.agent is None:
+            raise Exception("The configuration has no `agent` section")
+        agent = Agent(conductor, config.agent)
+
+        def config_changed(config: Config) -> None:
+            if config.agent is not None:
+                agent.reconfigure(config.agent)
+
+        config_file.subscribe(config_changed)
+        await agent.run()
+
+
+if __name__ == "__main__":
+    run_until_terminated(main())
@@ -0,0 +1,36 @@
+"""
+Runs the conductor as a daemon for web workers (see `Config.conductor_socket`):
+
+    QUART_MEGAMEK_MULTI_SERVER=config.json python -m megamek_multi_server.daemon
+"""
+
+import asyncio
+
+from .logic.daemon import DaemonListener
+from .logic.nodes import AgentListener
+from .standalone import run_until_terminated, standalone_conductor
+
+
+async def main() -> None:
+    async with standalone_conductor() as (conductor, config_file):
+        config = config_file.value
+        if config.conductor_socket is None:
+            raise Exception("The configuration has no `conductorSocket`")
+
+        workers = DaemonListener(conductor, config.conductor_socket)
+        await workers.start()
+        agents = None
+        if config.agents is not None:
+            agents = AgentListener.from_config(conductor, config.agents)
+            await agents.start()
+        try:
+            # Until terminated.
+            await asyncio.Event().wait()
+        finally:
+            if agents is not None:
+                await agents.close()
+            await workers.close()
+
+
+if __name__ == "__main__":
+    run_until_terminated(main())
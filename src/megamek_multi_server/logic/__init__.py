@@ -1,4 +1,4 @@
-from . import auth, conductor, config, events, extension, server, server_description
+from . import auth, conductor, config, events, extension, server, server_description, wire
 from .commands import Command
 from .events import Event
 
@@ -10,6 +10,7 @@ __all__ = [
     "extension",
     "server_description",
     "server",
+    "wire",
     "Command",
     "Event",
 ]
@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import UUID
+
+from megamek_multi_server.utils.files import directory_modified
+from megamek_multi_server.utils.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_IGNORED,
+    IN_MODIFY,
+    IN_MOVED_TO,
+    Inotify,
+)
+
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_TO
+_POLL_INTERVAL: timedelta = timedelta(minutes=1)
+
+
+class ActivityTracker:
+    """
+    Keeps in memory the last time each server wrote into a directory (its logs).
+
+    It uses inotify when available and falls back to periodically checking the
+    modification times outside of the event loop.
+    """
+
+    _last: dict[UUID, datetime]
+    _inotify: Inotify | None
+    _watches: dict[int, UUID]
+    _descriptors: dict[UUID, int]
+    _polled: dict[UUID, Path]
+    _poll: asyncio.Task | None
+
+    def __init__(self) -> None:
+        self._last = {}
+        self._inotify = None
+        self._watches = {}
+        self._descriptors = {}
+        self._polled = {}
+        self._poll = None
+
+    def start(self) -> None:
+        try:
+            self._inotify = Inotify(self._on_event)
+        except OSError as e:
+            print(f"inotify not available, polling for activity instead: {e}")
+
+    async def close(self) -> None:
+        if self._poll is not None:
+            self._poll.cancel()
+            await asyncio.gather(self._poll, return_exceptions=True)
+            self._poll = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def watch(self, id: UUID, path: Path) -> None:
+        """Starts tracking a directory. It counts as activity."""
+        self.touch(id)
+        if self._inotify is not None:
+            try:
+                wd = self._inotify.add_watch(str(path), _WATCH_MASK)
+                self._watches[wd] = id
+                self._descriptors[id] = wd
+                return
+            except OSError as e:
+                print(f"Could not watch {path}, polling it instead: {e}")
+
+        self._polled[id] = path
+        if self._poll is None:
+            self._poll = asyncio.create_task(self._poll_forever())
+
+    def unwatch(self, id: UUID) -> None:
+        self._last.pop(id, None)
+        self._polled.pop(id, None)
+        wd = self._descriptors.pop(id, None)
+        if wd is not None:
+            del self._watches[wd]
+            if self._inotify is not None:
+                self._inotify.rm_watch(wd)
+
+    def touch(self, id: UUID) -> None:
+        self._last[id] = datetime.now(timezone.utc)
+
+    def last_activity(self, id: UUID) -> datetime | None:
+        return self._last.get(id)
+
+    def _on_event(self, wd: int, mask: int, _name: bytes) -> None:
+        id = self._watches.get(wd)
+        if id is None:
+            return
+        if mask & IN_IGNORED:
+            # The directory is gone.
+            del self._watches[wd]
+            del self._descriptors[id]
+            return
+        self.touch(id)
+
+    async def _poll_forever(self) -> None:
+        while True:
+            await asyncio.sleep(_POLL_INTERVAL.total_seconds())
+            modified = await asyncio.to_thread(_modified_times, dict(self._polled))
+            for id, mod in modified.items():
+                last = self._last.get(id)
+                if last is not None and last < mod:
+                    self._last[id] = mod
+
+
+def _modified_times(paths: dict[UUID, Path]) -> dict[UUID, datetime]:
+    modified = {}
+    for id, path in paths.items():
+        try:
+            modified[id] = directory_modified(str(path))
+        except (OSError, ValueError):
+            # Missing or empty directory.
+            pass
+    return modified
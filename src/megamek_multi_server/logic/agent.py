@@ -0,0 +1,90 @@
+import asyncio
+import ssl
+from datetime import timedelta
+
+from megamek_multi_server.utils.tasks import BackgroundTasks
+
+from .agent_protocol import AgentEvent, Hello, receive, send, StartServer, StopServer, STREAM_LIMIT
+from .conductor import Conductor
+from .config import AgentConfig
+
+_INITIAL_RECONNECT_DELAY = timedelta(seconds=1)
+_MAX_RECONNECT_DELAY = timedelta(seconds=30)
+
+
+class Agent:
+    """
+    Runs servers for a central conductor. It connects to it, follows its
+    commands and sends back the events of the local conductor.
+    """
+
+    _conductor: Conductor
+    _config: AgentConfig
+    _commands: BackgroundTasks
+
+    def __init__(self, conductor: Conductor, config: AgentConfig) -> None:
+        self._conductor = conductor
+        self._config = config
+        self._commands = BackgroundTasks()
+
+    def reconfigure(self, config: AgentConfig) -> None:
+        """Changes are used when connecting again."""
+        self._config = config
+
+    async def run(self) -> None:
+        """Keeps connected to the central conductor until cancelled."""
+        delay = _INITIAL_RECONNECT_DELAY
+        try:
+            while True:
+                try:
+                    await self._connect()
+                    delay = _INITIAL_RECONNECT_DELAY
+                except Exception as e:
+                    print(f"Connection to {self._config.conductor} failed: {e!r}")
+                await asyncio.sleep(delay.total_seconds())
+                delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+        finally:
+            await self._commands.close()
+
+    async def _connect(self) -> None:
+        host, port = self._config.conductor.rsplit(":", 1)
+        context = None
+        if self._config.tls:
+            context = ssl.create_default_context(cafile=self._config.ca_file)
+        reader, writer = await asyncio.open_connection(
+            host, int(port), limit=STREAM_LIMIT, ssl=context
+        )
+        print(f"Connected to {self._config.conductor}")
+        await send(writer, Hello(token=self._config.token, host=self._config.host))
+        await serve_conductor(self._conductor, reader, writer, self._commands)
+        print(f"Disconnected from {self._config.conductor}")
+
+
+async def serve_conductor(
+    conductor: Conductor,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    commands: BackgroundTasks,
+) -> None:
+    """
+    Lets the other end of a connection use `conductor`: it follows its
+    commands and sends it all the events. Returns once disconnected.
+    """
+    forward = asyncio.create_task(_forward_events(conductor, writer))
+    try:
+        while (message := await receive(reader)) is not None:
+            if isinstance(message, StartServer):
+                commands.spawn(
+                    conductor.start_server(message.config_name, message.id, message.creator)
+                )
+            elif isinstance(message, StopServer):
+                commands.spawn(conductor.stop_server(message.id))
+    finally:
+        forward.cancel()
+        writer.close()
+
+
+async def _forward_events(conductor: Conductor, writer: asyncio.StreamWriter) -> None:
+    # Each connection starts with a snapshot, so nothing is missed.
+    async for message in conductor.events(stats=True):
+        await send(writer, AgentEvent(event=message.event))
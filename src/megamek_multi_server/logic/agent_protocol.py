@@ -0,0 +1,63 @@
+"""
+Messages between the central conductor and its agents: one JSON object per
+line over a TCP connection opened by the agent.
+"""
+
+import asyncio
+from typing import Annotated, Literal, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from .events import Event
+
+# Snapshots of many servers can make long lines.
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class Hello(BaseModel):
+    """First message of an agent."""
+
+    kind: Literal["hello"] = Field(default="hello")
+    token: str
+    # Where players connect to reach the servers of this agent.
+    host: str
+
+
+class StartServer(BaseModel):
+    kind: Literal["start_server"] = Field(default="start_server")
+    config_name: str
+    id: UUID
+    creator: Optional[str]
+
+
+class StopServer(BaseModel):
+    kind: Literal["stop_server"] = Field(default="stop_server")
+    id: UUID
+
+
+class AgentEvent(BaseModel):
+    """An event of the conductor of an agent."""
+
+    kind: Literal["event"] = Field(default="event")
+    event: Event
+
+
+AgentMessage = Annotated[
+    Hello | StartServer | StopServer | AgentEvent,
+    Field(discriminator="kind"),
+]
+_MESSAGE = TypeAdapter(AgentMessage)
+
+
+async def send(writer: asyncio.StreamWriter, message: BaseModel) -> None:
+    writer.write(message.model_dump_json().encode() + b"\n")
+    await writer.drain()
+
+
+async def receive(reader: asyncio.StreamReader) -> AgentMessage | None:
+    """Next message, or `None` once the connection is closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    return _MESSAGE.validate_json(line)
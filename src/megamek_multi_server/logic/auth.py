@@ -1,28 +1,101 @@
-from typing import TypeVar
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional, TypeVar
 
 from werkzeug.security import check_password_hash, generate_password_hash
 
-from megamek_multi_server.utils.file_signature import Signature
+from megamek_multi_server.utils.rate_limit import RateLimiter
+from megamek_multi_server.utils.watched_file import WatchedFile
+
+from . import metrics
+from .tracing import TRACER
 
 _DEFAULT_PASSWORD = generate_password_hash("")
 
+# Password hashing is slow on purpose, so it's done outside the event loop.
+_MAX_CONCURRENT_CHECKS = 2
+_MAX_PENDING_CHECKS = 32
+
+# Failed logins allowed in a period before rejecting any attempt.
+_FAILED_LOGINS_WINDOW = timedelta(minutes=15)
+_MAX_FAILED_LOGINS_PER_USER = 5
+_MAX_FAILED_LOGINS_PER_ADDRESS = 20
+
+
+class TooManyAttempts(Exception):
+    """Login rejected without checking the password."""
+
 
 class FileAuth:
     """User logging from a password file."""
 
-    _path: str
-    _cache: tuple[Signature, dict[str, str]]
+    _passwords: WatchedFile[dict[str, str]]
+    _executor: ThreadPoolExecutor
+    _pending_checks: int
+    _failed_by_user: RateLimiter
+    _failed_by_address: RateLimiter
 
     def __init__(self, path: str):
-        self._path = path
-        self._update_cache(None)
+        self._passwords = WatchedFile(path, _deserialize)
+        self._executor = ThreadPoolExecutor(
+            max_workers=_MAX_CONCURRENT_CHECKS, thread_name_prefix="password-check"
+        )
+        self._pending_checks = 0
+        self._failed_by_user = RateLimiter(_MAX_FAILED_LOGINS_PER_USER, _FAILED_LOGINS_WINDOW)
+        self._failed_by_address = RateLimiter(_MAX_FAILED_LOGINS_PER_ADDRESS, _FAILED_LOGINS_WINDOW)
+
+    def start(self) -> None:
+        """Starts reloading the password file when it changes."""
+        self._passwords.start()
+
+    async def close(self) -> None:
+        await self._passwords.close()
+        self._executor.shutdown(wait=False)
+
+    async def verify(self, username: str, password: str, *, address: Optional[str]) -> bool:
+        """
+        Checks a login without blocking the event loop.
+
+        Raises `TooManyAttempts` if there were too many failed logins for the
+        user or the address, or if too many logins are being checked already.
+        """
+        # Security: rejections do not depend on the user existing, so they
+        #   don't leak usernames.
+        if self._failed_by_user.exceeded(username):
+            raise TooManyAttempts()
+        if address is not None and self._failed_by_address.exceeded(address):
+            raise TooManyAttempts()
+        if self._pending_checks >= _MAX_PENDING_CHECKS:
+            raise TooManyAttempts()
+
+        self._pending_checks += 1
+        start = time.perf_counter()
+        try:
+            # Security: without the username, which could be a mistyped password.
+            with TRACER.tagged("logins"), TRACER.span("verify_password"):
+                valid = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.check_password, username, password
+                )
+        finally:
+            self._pending_checks -= 1
+            metrics.LOGIN_VERIFICATION.observe(time.perf_counter() - start)
+
+        if valid:
+            self._failed_by_user.reset(username)
+        else:
+            self._failed_by_user.hit(username)
+            if address is not None:
+                self._failed_by_address.hit(address)
+        return valid
 
     def check_password(self, username: str, password: str) -> bool:
         """Gets the password hash of a user."""
         if not username or not password:
             return False
 
-        password_hash = self._entries().get(username)
+        password_hash = self._passwords.value.get(username)
 
         # Security: It's important to NOT return early. Doing so would leak all
         #   the usernames with a timming attack (real users would take time to
@@ -37,17 +110,6 @@ class FileAuth:
         # somebody uses the same password as `_DEFAULT_PASSWORD`.
         return password_hash is not None and password_valid
 
-    def _entries(self) -> dict[str, str]:
-        sig = Signature.for_file(self._path)
-        if self._cache[0] != sig:
-            self._update_cache(sig)
-        return self._cache[1]
-
-    def _update_cache(self, sig: Signature | None) -> None:
-        if sig is None:
-            sig = Signature.for_file(self._path)
-        self._cache = (sig, _deserialize(self._path))
-
 
 T = TypeVar("T")
 
@@ -0,0 +1,90 @@
+import hashlib
+from collections.abc import Sequence
+from pathlib import Path
+
+_ARCHIVE_SUFFIX = ".jsa"
+_RECORDING_SUFFIX = ".recording.jsa"
+
+
+class ClassDataArchives:
+    """
+    Class data sharing (AppCDS) archives for each `exe`, so the JVM maps the
+    classes of MegaMek instead of loading them again on every start.
+
+    The first server of an `exe` records its archive when it exits, and the
+    ones started after it use it. Only for `exe`s that run `java` directly.
+    """
+
+    _path: Path
+    # Keys of the archives being recorded (by one server each).
+    _recording: set[str]
+    # Keys of the archives that made the JVM fail, so they are not used again.
+    _broken: set[str]
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._recording = set()
+        self._broken = set()
+
+    def start(self) -> None:
+        self._path.mkdir(parents=True, exist_ok=True)
+        # Left by servers that didn't exit while we were running.
+        for path in self._path.glob(f"*{_RECORDING_SUFFIX}"):
+            path.unlink(missing_ok=True)
+
+    def options(self, exe: Sequence[str]) -> list[str]:
+        """JVM options to add to `exe` (right after `java`)."""
+        if not _is_java(exe):
+            return []
+        key = _key(exe)
+        if key in self._broken:
+            return []
+        archive = self._path / f"{key}{_ARCHIVE_SUFFIX}"
+        if archive.exists():
+            return [f"-XX:SharedArchiveFile={archive}"]
+        if key in self._recording:
+            return []
+        self._recording.add(key)
+        return [f"-XX:ArchiveClassesAtExit={self._path / f'{key}{_RECORDING_SUFFIX}'}"]
+
+    def exited(self, exe: Sequence[str], options: Sequence[str]) -> None:
+        """Keeps the archive recorded by a server with `options`, if any."""
+        if not options or not options[0].startswith("-XX:ArchiveClassesAtExit="):
+            return
+        key = _key(exe)
+        self._recording.discard(key)
+        recording = self._path / f"{key}{_RECORDING_SUFFIX}"
+        try:
+            if recording.stat().st_size > 0:
+                recording.rename(self._path / f"{key}{_ARCHIVE_SUFFIX}")
+                print(f"Recorded class data archive {key}")
+                return
+        except OSError:
+            pass
+        # E.g. it was killed. The next server tries again.
+        recording.unlink(missing_ok=True)
+
+    def failed(self, exe: Sequence[str], options: Sequence[str]) -> None:
+        """The JVM didn't start with `options`, so `exe` runs without archives."""
+        if not options:
+            return
+        key = _key(exe)
+        print(f"The JVM failed with class data archive {key}. Not using it anymore.")
+        self._broken.add(key)
+        self._recording.discard(key)
+        (self._path / f"{key}{_ARCHIVE_SUFFIX}").unlink(missing_ok=True)
+        (self._path / f"{key}{_RECORDING_SUFFIX}").unlink(missing_ok=True)
+
+
+def with_options(exe: Sequence[str], options: Sequence[str]) -> list[str]:
+    """`exe` with JVM `options` (which go before the class to run)."""
+    return [exe[0], *options, *exe[1:]]
+
+
+def _is_java(exe: Sequence[str]) -> bool:
+    return bool(exe) and Path(exe[0]).name == "java"
+
+
+def _key(exe: Sequence[str]) -> str:
+    # The JDK and the classpath (and so the MegaMek version) are in `exe`.
+    return hashlib.sha256("\0".join(exe).encode()).hexdigest()[:16]
@@ -1,13 +1,22 @@
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Annotated, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+from .server import ServerState
+from .server_info import ServerInfo
+
+# Servers that can be asked for at once.
+_MAX_BULK_CREATE = 100
+
 
 class CommandType(str, Enum):
     create_server = "create_server"
     destroy_server = "destroy_server"
+    create_servers = "create_servers"
+    destroy_servers = "destroy_servers"
 
 
 class CreateServer(BaseModel):
@@ -25,7 +34,49 @@ class DestroyServer(BaseModel):
     id: UUID
 
 
+class CreateServers(BaseModel):
+    """Asks the server to create several MegaMek servers of the same configuration."""
+
+    cmd_type: Literal[CommandType.create_servers] = Field(default=CommandType.create_servers)
+    server: str
+    count: int = Field(gt=0, le=_MAX_BULK_CREATE)
+    # To follow its progress (see `BulkProgress`).
+    bulk_id: Optional[UUID] = None
+
+
+class ServerFilter(BaseModel):
+    """Which servers to pick. Unset fields match any server."""
+
+    creator: Optional[str] = None
+    config_name: Optional[str] = None
+    state: Optional[ServerState] = None
+    # Time since the server last wrote to its directory (`last_activity`).
+    idle_for: Optional[timedelta] = None
+
+    def matches(self, info: ServerInfo) -> bool:
+        if self.creator is not None and info.creator != self.creator:
+            return False
+        if self.config_name is not None and info.config_name != self.config_name:
+            return False
+        if self.state is not None and info.state != self.state:
+            return False
+        if self.idle_for is not None:
+            if info.last_activity is None:
+                return False
+            idle = datetime.now(info.last_activity.tzinfo) - info.last_activity
+            return idle >= self.idle_for
+        return True
+
+
+class DestroyServers(BaseModel):
+    """Asks the server to stop and destroy all the MegaMek servers that match a filter."""
+
+    cmd_type: Literal[CommandType.destroy_servers] = Field(default=CommandType.destroy_servers)
+    filter: ServerFilter
+    bulk_id: Optional[UUID] = None
+
+
 Command = Annotated[
-    CreateServer | DestroyServer,
+    CreateServer | DestroyServer | CreateServers | DestroyServers,
     Field(discriminator="cmd_type"),
 ]
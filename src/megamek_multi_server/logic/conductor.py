@@ -1,61 +1,329 @@
 import asyncio
+import itertools
 import json
-from asyncio import Queue
-from collections.abc import AsyncGenerator
+import math
+import os
+import signal
+import time
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from megamek_multi_server.utils.net import next_port
+from megamek_multi_server.utils.net import is_port_open
+from megamek_multi_server.utils.ports import PortAllocator
+from megamek_multi_server.utils.procfs import processes_in, start_time
+from megamek_multi_server.utils.tasks import BackgroundTasks, bounded_map
 
+from . import metrics
+from .activity import ActivityTracker
+from .class_data import ClassDataArchives
+from .commands import ServerFilter
+from .config import Config, QuotasConfig
 from .events import (
+    BulkItem,
+    BulkProgress,
     ConfigChange,
     Error,
     Event,
     ServerAdded,
+    ServerPlayersChanged,
+    ServerQueuePosition,
     ServerRemoved,
     ServersSet,
     ServerStateChanged,
+    ServerStats,
 )
+from .journal import Journal
+from .nodes import RemoteNode
+from .players import PlayerCounter
+from .quotas import check_quotas, Usage
+from .reclaimer import Reclaimer
+from .registry import RegisteredServer, ServerRegistry
 from .server import MegaMekServer, ServerState
 from .server_description import ServerDescription
 from .server_info import ServerInfo
+from .setup_templates import SetupTemplates
+from .spawn_scheduler import SpawnCancelled, SpawnScheduler
+from .stats import StatsSampler
+from .subscriber import Subscriber
+from .tracing import TRACER
+from .warm_pool import WarmPool
+from .wire import Message
+
+# Events a client can have pending before its backlog is replaced by a snapshot.
+_MAX_PENDING_EVENTS = 256
+# Events kept to let clients resume their subscription.
+_JOURNAL_SIZE = 1024
+# Servers without activity for this long are stopped.
+_AUTO_STOP_SERVER: timedelta = timedelta(minutes=30)
+_IDLE_CHECK_INTERVAL: timedelta = timedelta(minutes=1)
+_PLAYERS_SAMPLE_INTERVAL: timedelta = timedelta(seconds=15)
+_STATS_SAMPLE_INTERVAL: timedelta = timedelta(seconds=5)
+# Samples of resource usage kept for each server (10 minutes).
+_STATS_HISTORY_SIZE = 120
+# Inside the base path, so files can be cloned from templates and moved to the
+# trash (same file system).
+_TEMPLATES_DIR = ".templates"
+_TRASH_DIR = ".trash"
+# Kept with the servers, so archives survive restarts if `data_dir` is set.
+_CLASS_DATA_DIR = ".class-data"
 
 
 class Conductor:
     _descriptions: dict[str, ServerDescription]
     base_path: Path
     _servers: dict[UUID, MegaMekServer]
-    _aquired_ports: set[int]
-    _queues: set[Queue[Event]]
+    # Starts of the servers not running yet, so destroying them can cancel it.
+    _starts: dict[UUID, asyncio.Task[None]]
+    _ports: PortAllocator
+    _subscribers: set[Subscriber]
+    # Subscribers that also get `ServerStats` events.
+    _stats_subscribers: set[Subscriber]
+    _journal: Journal
     _max_servers: Optional[int]
+    _warm_pool: WarmPool
+    _warm_pool_counts: bool
+    _activity: ActivityTracker
+    _players: PlayerCounter
+    _stats: StatsSampler
+    _empty_server_timeout: Optional[timedelta]
+    _memory_budget: Optional[int]
+    _bulk_concurrency: int
+    _quotas: QuotasConfig
+    _spawns: SpawnScheduler
+    _nodes: set[RemoteNode]
+    _registry: Optional[ServerRegistry]
+    _templates: SetupTemplates
+    _reclaimer: Reclaimer
+    _class_data: Optional[ClassDataArchives]
+    _tasks: BackgroundTasks
 
     def __init__(
         self,
         base_path: Path,
         descriptions: dict[str, ServerDescription],
         max_servers: Optional[int],
+        *,
+        warm_pool: int = 0,
+        warm_pool_counts: bool = False,
+        ports: range = range(2346, 65535),
+        empty_server_timeout: Optional[timedelta] = None,
+        memory_budget: Optional[int] = None,
+        bulk_concurrency: int = 4,
+        max_concurrent_spawns: Optional[int] = None,
+        quotas: Optional[QuotasConfig] = None,
+        class_data_sharing: bool = False,
+        registry: Optional[ServerRegistry] = None,
     ) -> None:
         self.base_path = base_path
         self._descriptions = descriptions
         self._max_servers = max_servers
         self._servers = {}
-        self._aquired_ports = set()
-        self._queues = set()
+        self._starts = {}
+        self._ports = PortAllocator(ports)
+        self._subscribers = set()
+        self._stats_subscribers = set()
+        self._journal = Journal(_JOURNAL_SIZE)
+        self._warm_pool = WarmPool(
+            warm_pool,
+            new_server=self._new_pooled_server,
+            discard=self._release_server_port,
+            can_grow=self._pool_can_grow,
+        )
+        self._warm_pool_counts = warm_pool_counts
+        self._activity = ActivityTracker()
+        self._players = PlayerCounter()
+        self._stats = StatsSampler(_STATS_HISTORY_SIZE)
+        self._empty_server_timeout = empty_server_timeout
+        self._memory_budget = memory_budget
+        self._bulk_concurrency = bulk_concurrency
+        self._quotas = quotas or QuotasConfig()
+        self._spawns = SpawnScheduler(
+            _spawn_limit(max_concurrent_spawns),
+            position_changed=self._queue_position_changed,
+            rank=self._spawn_rank,
+        )
+        self._nodes = set()
+        self._registry = registry
+        self._templates = SetupTemplates(base_path / _TEMPLATES_DIR)
+        self._reclaimer = Reclaimer(base_path / _TRASH_DIR)
+        self._class_data = (
+            ClassDataArchives(base_path / _CLASS_DATA_DIR) if class_data_sharing else None
+        )
+        self._tasks = BackgroundTasks()
+
+    @staticmethod
+    def from_config(
+        base_path: Path, config: Config, *, registry: Optional[ServerRegistry] = None
+    ) -> "Conductor":
+        return Conductor(
+            base_path,
+            config.servers,
+            config.max_servers,
+            warm_pool=config.warm_pool,
+            warm_pool_counts=config.warm_pool_counts,
+            ports=range(*config.port_range),
+            empty_server_timeout=config.empty_server_timeout,
+            memory_budget=config.memory_budget,
+            bulk_concurrency=config.bulk_concurrency,
+            max_concurrent_spawns=config.max_concurrent_spawns,
+            quotas=config.quotas,
+            class_data_sharing=config.class_data_sharing,
+            registry=registry,
+        )
+
+    async def restore(self) -> None:
+        """
+        Takes control again of the servers of a previous run that are still
+        alive. Anything else they left is killed, and removed in the background.
+        """
+        if self._registry is None:
+            return
+        registered = self._registry.load()
+        alive = await asyncio.gather(*(_is_still_running(entry) for entry in registered))
+        for entry, is_alive in zip(registered, alive):
+            if not is_alive or entry.pid is None:
+                self._registry.remove(entry.id)
+                continue
+            server = MegaMekServer.adopt(
+                entry.id,
+                entry.config_name,
+                entry.description,
+                Path(entry.path),
+                entry.port,
+                entry.pid,
+                creator=entry.creator,
+                creation_timestamp=entry.creation_timestamp,
+                state_changed=self._state_changed,
+                reclaimer=self._reclaimer,
+            )
+            print(f"Reattached to server {server.id} on {server.port}")
+            self._servers[server.id] = server
+            self._ports.reserve(server.port)
+            self._track(server)
+        # Before anything new is started, which would look like a leftover.
+        await self._clean_up_leftovers()
+
+    def start(self) -> None:
+        """Starts background work (idle checks and filling the warm pool)."""
+        self._activity.start()
+        self._reclaimer.start()
+        if self._class_data is not None:
+            self._class_data.start()
+        self._templates.update(d.setup for d in self._descriptions.values())
+        self._tasks.spawn(self._stop_idle_servers())
+        self._tasks.spawn(self._sample_players())
+        self._tasks.spawn(self._sample_stats())
+        self._refill_warm_pool()
 
     def server_descriptions(self) -> list[str]:
-        return list(self._descriptions.keys())
+        """Names of the descriptions that can be created here or in an agent."""
+        names = dict.fromkeys(self._descriptions)
+        for node in self._nodes:
+            names.update(dict.fromkeys(node.descriptions))
+        return list(names)
+
+    def reconfigure(self, config: Config) -> None:
+        """
+        Applies a new configuration. Running servers are left untouched, but
+        pooled servers of changed or removed descriptions are replaced.
+        """
+        for config_name, description in self._descriptions.items():
+            if config.servers.get(config_name) != description:
+                self._warm_pool.invalidate(config_name)
+        self._descriptions = dict(config.servers)
+        self._templates.update(d.setup for d in self._descriptions.values())
+        self._max_servers = config.max_servers
+        self._warm_pool_counts = config.warm_pool_counts
+        self._warm_pool.resize(config.warm_pool)
+        self._empty_server_timeout = config.empty_server_timeout
+        self._memory_budget = config.memory_budget
+        self._bulk_concurrency = config.bulk_concurrency
+        self._quotas = config.quotas
+        self._spawns.resize(_spawn_limit(config.max_concurrent_spawns))
+        self._broadcast_event(self._config_change())
+        self._refill_warm_pool()
 
     async def start_server(
         self, config_name: str, id: Optional[UUID], creator: Optional[str]
     ) -> None:
+        # Servers without an id yet are given one when created.
+        track = str(id) if id is not None else None
+        with TRACER.tagged(track, config=config_name, creator=creator):
+            with TRACER.span("start_server"):
+                error = await self._try_start_server(config_name, id, creator)
+        if error is not None:
+            if id is not None:
+                # So whoever asked for it knows it's theirs (errors are for everyone).
+                error.extra_data["id"] = id
+            self._broadcast_event(error)
+
+    def create_server(self, config_name: str, id: Optional[UUID], creator: Optional[str]) -> None:
+        """
+        Starts a server in the background, so whoever asked (e.g. a websocket
+        reading commands) doesn't wait while it's queued.
+        """
+        self._tasks.spawn(self.start_server(config_name, id, creator))
+
+    def create_servers(
+        self, config_name: str, count: int, creator: Optional[str], bulk_id: Optional[UUID]
+    ) -> None:
+        """Starts several servers in the background (see `BulkProgress`)."""
+        ids = [uuid4() for _ in range(count)]
+
+        async def start(id: UUID) -> Optional[Error]:
+            return await self._try_start_server(config_name, id, creator)
+
+        self._tasks.spawn(self._run_bulk(bulk_id or uuid4(), ids, start))
+
+    def destroy_servers(self, filter: ServerFilter, bulk_id: Optional[UUID]) -> None:
+        """Stops the servers that match `filter` in the background (see `BulkProgress`)."""
+        ids = [info.id for info in self.all_servers_info() if filter.matches(info)]
+        self._tasks.spawn(self._run_bulk(bulk_id or uuid4(), ids, self.stop_server))
+
+    async def _try_start_server(
+        self, config_name: str, id: Optional[UUID], creator: Optional[str]
+    ) -> Optional[Error]:
+        """Starts a server. Returns why if it's not allowed."""
+        with TRACER.span("check_quotas"):
+            error = self._check_quotas(config_name, creator)
+        if error is not None:
+            return error
+
+        if (node := self._place(config_name)) is not None:
+            return await node.start_server(config_name, id or uuid4(), creator)
+
+        if config_name not in self._descriptions and any(
+            config_name in node.descriptions for node in self._nodes
+        ):
+            # Only agents can start it, and they are full.
+            return server_limit_reached_error(self._total_max_servers() or 0)
+
         description = self._descriptions[config_name]
 
-        if self._max_servers is not None and self._max_servers <= len(self._aquired_ports):
-            self._broadcast_event(server_limit_reached_error(self._max_servers))
-            return
+        if self._max_servers is not None and self._server_limit_reached(config_name):
+            max_servers = self._total_max_servers()
+            return server_limit_reached_error(max_servers or self._max_servers)
+
+        pooled_ready = self._warm_pool.has_ready(config_name)
+        if not pooled_ready and not self._memory_available(description):
+            assert self._memory_budget is not None
+            return memory_budget_exceeded_error(
+                description, self._memory_budget - self._memory_used()
+            )
+
+        if pooled := self._warm_pool.take(config_name):
+            pooled.claim(state_changed=self._state_changed, id=id, creator=creator)
+            self._servers[pooled.id] = pooled
+            self._track(pooled)
+            self._persist(pooled)
+            self._broadcast_event(ServerAdded(info=self._info(pooled)))
+            self._warm_pool.refill(config_name)
+            return None
 
-        port = self._aquire_port()
+        port = self._acquire_port()
         try:
             server = MegaMekServer(
                 config_name=config_name,
@@ -65,63 +333,469 @@ class Conductor:
                 state_changed=self._state_changed,
                 id=id,
                 creator=creator,
+                templates=self._templates,
+                reclaimer=self._reclaimer,
+                scheduler=self._spawns,
+                class_data=self._class_data,
+                # So it outlives us without a pipe nobody reads.
+                output_to_file=self._registry is not None,
             )
-            self._broadcast_event(ServerAdded(info=ServerInfo.from_server(server)))
-            self._servers[server.id] = server
-            await server.start()
         except Exception as e:
-            self._aquired_ports.remove(port)
+            self._ports.release(port)
             raise e
 
+        self._broadcast_event(ServerAdded(info=self._info(server)))
+        self._servers[server.id] = server
+        start = asyncio.create_task(self._start(server))
+        self._starts[server.id] = start
+        try:
+            await start
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            if current is not None and current.cancelling():
+                raise
+            # It was destroyed while starting (see `stop_server`).
+        finally:
+            self._starts.pop(server.id, None)
+        return None
+
+    async def _start(self, server: MegaMekServer) -> None:
+        try:
+            await server.start()
+        except SpawnCancelled:
+            await server.abort()
+            return
+        except (Exception, asyncio.CancelledError):
+            # Also if cancelled (e.g. shutting down, or destroyed while it's
+            # starting). Reaching `dead` removes it and releases its port, once
+            # the process is gone.
+            await server.abort()
+            raise
+        self._track(server)
+
+    async def _run_bulk(
+        self,
+        bulk_id: UUID,
+        ids: list[UUID],
+        action: Callable[[UUID], Awaitable[Optional[Error]]],
+    ) -> None:
+        if not ids:
+            self._broadcast_event(BulkProgress(bulk_id=bulk_id, done=0, total=0, item=None))
+            return
+        done = 0
+        async for id, result in bounded_map(action, ids, self._bulk_concurrency):
+            done += 1
+            if isinstance(result, Error):
+                error: Optional[str] = result.message
+            elif isinstance(result, Exception):
+                error = str(result) or type(result).__name__
+            else:
+                error = None
+            item = BulkItem(id=id, error=error)
+            self._broadcast_event(
+                BulkProgress(bulk_id=bulk_id, done=done, total=len(ids), item=item)
+            )
+
     async def shutdown(self) -> None:
-        await self.stop_all_servers()
-        queues = self._queues
-        self._queues = set()
-        for queue in queues:
-            queue.shutdown()
+        await self._tasks.close()
+        await self._warm_pool.close()
+        await self._templates.close()
+        if self._registry is None:
+            await self.stop_all_servers()
+        else:
+            # They are taken again after restarting.
+            for server in self._servers.values():
+                server.detach()
+        await self._reclaimer.close()
+        await self._activity.close()
+        subscribers = self._subscribers
+        self._subscribers = set()
+        self._stats_subscribers = set()
+        for subscriber in subscribers:
+            subscriber.close()
 
     async def stop_all_servers(self) -> None:
-        await asyncio.gather(*(self.stop_server(id) for id in self._servers.keys()))
+        ids = list(self._servers.keys())
+        async for id, result in bounded_map(self.stop_server, ids, self._bulk_concurrency):
+            if isinstance(result, Exception):
+                print(f"Could not stop server {id}: {result!r}")
 
     async def stop_server(self, server_id: UUID) -> None:
+        if (node := self._node_of(server_id)) is not None:
+            await node.stop_server(server_id)
+            return
+
         server = self._servers[server_id]
-        try:
-            await server.stop()
-        except Exception as e:
-            # The process may have crashed or something. The dead state may not
-            # be propegated, so we clean it up.
-            self._remove_server(server_id)
-            raise e
+        if server.state == ServerState.queued and self._spawns.cancel(server_id):
+            # Removed once its start notices.
+            return
+        if (start := self._starts.get(server_id)) is not None and not start.done():
+            # Still setting up or spawning. Its start kills and removes it.
+            start.cancel()
+            await asyncio.wait([start])
+            return
+        with TRACER.tagged(str(server_id), server=str(server_id), creator=server.creator):
+            try:
+                with TRACER.span("stop_server"):
+                    await server.stop()
+            except Exception as e:
+                # The process may have crashed or something. The dead state may not
+                # be propegated, so we clean it up.
+                self._remove_server(server_id)
+                raise e
 
     def all_servers_info(self) -> list[ServerInfo]:
-        return [ServerInfo.from_server(server) for server in self._servers.values()]
+        local = [self._info(server) for server in self._servers.values()]
+        return local + [info for node in self._nodes for info in node.servers.values()]
 
     def server_info(self, server_id: UUID) -> ServerInfo:
+        if (node := self._node_of(server_id)) is not None:
+            return node.servers[server_id]
         server = self._servers[server_id]
-        return ServerInfo.from_server(server)
-
-    def _aquire_port(self) -> int:
-        port = next_port(range(2346, 65535), self._aquired_ports)
-        self._aquired_ports.add(port)
-        return port
-
-    async def events(self) -> AsyncGenerator[Event, None]:
-        queue: Queue[Event] = Queue()
-        self._queues.add(queue)
-        # TODO move initial events from here
-        yield ConfigChange(max_servers=self._max_servers)
-        yield ServersSet(servers=self.all_servers_info())
+        return self._info(server)
+
+    def attach_node(self, node: RemoteNode) -> None:
+        """Starts using an agent. Its servers are known once it sends its state."""
+        self._nodes.add(node)
+
+    def detach_node(self, node: RemoteNode) -> None:
+        """
+        Stops using an agent (e.g. it disconnected). Its servers are forgotten
+        until it connects again.
+        """
+        self._nodes.discard(node)
+        node.disconnected()
+        for id in node.servers:
+            self._broadcast_event(ServerRemoved(id=id))
+        node.servers = {}
+        self._broadcast_event(self._config_change())
+
+    def node_event(self, node: RemoteNode, event: Event) -> None:
+        """Merges an event of an agent into the ones of this conductor."""
+        if node.settle(event):
+            # Reported by whoever started the server (see `start_server`).
+            return
+        if isinstance(event, ConfigChange):
+            node.max_servers = event.max_servers
+            node.descriptions = event.servers
+            event = self._config_change()
+        elif isinstance(event, ServersSet):
+            for info in event.servers:
+                info.host = node.host or info.host
+            node.servers = {info.id: info for info in event.servers}
+            event = ServersSet(servers=self.all_servers_info())
+        elif isinstance(event, ServerAdded):
+            event.info.host = node.host or event.info.host
+            node.servers[event.info.id] = event.info
+        elif isinstance(event, ServerStateChanged):
+            if (known := node.servers.get(event.id)) is not None:
+                known.state = event.new_state
+        elif isinstance(event, ServerPlayersChanged):
+            if (known := node.servers.get(event.id)) is not None:
+                known.player_count = event.player_count
+        elif isinstance(event, ServerRemoved):
+            node.servers.pop(event.id, None)
+        elif isinstance(event, ServerStats):
+            self._push_stats(Message(event))
+            return
+        self._broadcast_event(event)
+
+    def _place(self, config_name: str) -> Optional[RemoteNode]:
+        """
+        Agent where a new server should be started, or `None` to start it here.
+        It picks the least loaded one that can run it.
+        """
+        candidates: list[tuple[tuple[float, int], Optional[RemoteNode]]] = []
+        if config_name in self._descriptions and not (
+            self._max_servers is not None and self._server_limit_reached(config_name)
+        ):
+            candidates.append((_load(len(self._servers), self._max_servers), None))
+        for node in self._nodes:
+            if node.can_start(config_name):
+                candidates.append((_load(node.server_count, node.max_servers), node))
+        if not candidates:
+            # Starting it here reports why it can't be done.
+            return None
+        return min(candidates, key=lambda candidate: candidate[0])[1]
+
+    def _node_of(self, server_id: UUID) -> Optional[RemoteNode]:
+        for node in self._nodes:
+            if server_id in node.servers:
+                return node
+        return None
+
+    def update_metrics(self) -> None:
+        """Updates the metrics that are only computed when they are read."""
+        metrics.SERVERS.set(len(self._servers) + sum(len(n.servers) for n in self._nodes))
+        metrics.MAX_SERVERS.set(math.nan if self._max_servers is None else self._max_servers)
+        metrics.WARM_POOL.set(len(self._warm_pool))
+        metrics.MEMORY_USED.set(self._memory_used())
+        metrics.MEMORY_BUDGET.set(math.nan if self._memory_budget is None else self._memory_budget)
+        metrics.PENDING_EVENTS.clear()
+        for subscriber in self._subscribers:
+            metrics.PENDING_EVENTS.labels(str(subscriber.id)).set(len(subscriber))
+
+    def _info(self, server: MegaMekServer) -> ServerInfo:
+        return ServerInfo.from_server(
+            server,
+            last_activity=self._activity.last_activity(server.id),
+            player_count=self._players.player_count(server.id),
+            queue_position=self._spawns.position(server.id),
+        )
+
+    async def _clean_up_leftovers(self) -> None:
+        """Kills and removes servers in the base path that are not known."""
+        known = {str(server.path) for server in self._servers.values()}
+        processes = await asyncio.to_thread(processes_in, str(self.base_path))
+        for pid, cwd in processes.items():
+            if not any(cwd == path or cwd.startswith(path + "/") for path in known):
+                print(f"Killing leftover process {pid}")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        for path in self.base_path.iterdir():
+            if str(path) not in known and path.name not in (
+                _TEMPLATES_DIR,
+                _TRASH_DIR,
+                _CLASS_DATA_DIR,
+            ):
+                self._reclaimer.reclaim(path)
+
+    def _persist(self, server: MegaMekServer) -> None:
+        if self._registry is None:
+            return
+        pid = server.pid
+        self._registry.record(
+            RegisteredServer(
+                id=server.id,
+                config_name=server.config_name,
+                description=server.description,
+                path=str(server.path),
+                port=server.port,
+                pid=pid,
+                pid_start_time=start_time(pid) if pid is not None else None,
+                creator=server.creator,
+                creation_timestamp=server.creation_timestamp,
+                state=server.state,
+            )
+        )
+
+    def _track(self, server: MegaMekServer) -> None:
+        # What stops the server once idle (see `_stop_idle_servers`).
+        with TRACER.span("track", server=str(server.id)):
+            self._activity.watch(server.id, server.path / "logs")
+            self._players.track(server.id)
+            if server.pid is not None:
+                self._stats.track(server.id, server.pid)
+
+    async def _stop_idle_servers(self) -> None:
+        while True:
+            await asyncio.sleep(_IDLE_CHECK_INTERVAL.total_seconds())
+            with TRACER.span("check_idle", servers=len(self._servers)):
+                for server in list(self._servers.values()):
+                    if server.state == ServerState.running and self._is_idle(server.id):
+                        print(f"Stopping unused server {server.id}")
+                        self._tasks.spawn(self.stop_server(server.id))
+
+    def _is_idle(self, server_id: UUID) -> bool:
+        now = datetime.now(timezone.utc)
+        last_activity = self._activity.last_activity(server_id)
+        if last_activity is not None and last_activity < now - _AUTO_STOP_SERVER:
+            return True
+        last_seen = self._players.last_seen(server_id)
+        return (
+            self._empty_server_timeout is not None
+            and last_seen is not None
+            and last_seen < now - self._empty_server_timeout
+        )
+
+    async def _sample_players(self) -> None:
+        while True:
+            await asyncio.sleep(_PLAYERS_SAMPLE_INTERVAL.total_seconds())
+            ports = {id: server.port for id, server in self._servers.items()}
+            changed = await self._players.sample(ports)
+            for id, count in changed.items():
+                self._broadcast_event(ServerPlayersChanged(id=id, player_count=count))
+            for id in ports:
+                # Players being connected counts as activity.
+                if self._players.player_count(id):
+                    self._activity.touch(id)
+
+    async def _sample_stats(self) -> None:
+        while True:
+            await asyncio.sleep(_STATS_SAMPLE_INTERVAL.total_seconds())
+            samples = await self._stats.sample()
+            if not self._stats_subscribers:
+                continue
+            for id, sample in samples.items():
+                self._push_stats(Message(ServerStats(id=id, samples=[sample])))
+
+    def _push_stats(self, message: Message) -> None:
+        for subscriber in self._stats_subscribers:
+            subscriber.push(message)
+
+    def _server_limit_reached(self, config_name: str) -> bool:
+        assert self._max_servers is not None
+        if self._warm_pool_counts:
+            # A pooled server already has its slot.
+            if self._warm_pool.has_ready(config_name):
+                return False
+            used = len(self._ports)
+        else:
+            used = len(self._ports) - len(self._warm_pool)
+        return self._max_servers <= used
+
+    def _memory_available(self, description: ServerDescription) -> bool:
+        """If there's enough memory in the budget to start a new server."""
+        if self._memory_budget is None:
+            return True
+        required = description.memory_reservation() or 0
+        return self._memory_used() + required <= self._memory_budget
+
+    def _check_quotas(self, config_name: str, creator: Optional[str]) -> Optional[Error]:
+        # Memory of servers of agents is guessed from the local description.
+        reservations = {
+            name: description.memory_reservation() or 0
+            for name, description in self._descriptions.items()
+        }
+        usage = [
+            Usage(server.creator, server.description.memory_reservation() or 0)
+            for server in self._servers.values()
+        ] + [
+            Usage(info.creator, reservations.get(info.config_name, 0))
+            for node in self._nodes
+            for info in node.servers.values()
+        ]
+        return check_quotas(self._quotas, creator, usage, reservations.get(config_name, 0))
+
+    def _memory_used(self) -> int:
+        """
+        Memory reserved by all the servers (including pooled ones). Servers
+        using more than what they reserved count with what they use.
+        """
+        used = 0
+        for server in itertools.chain(self._servers.values(), self._warm_pool.servers()):
+            reserved = server.description.memory_reservation() or 0
+            used += max(reserved, self._stats.last_rss(server.id) or 0)
+        return used
+
+    def _pool_can_grow(self, config_name: str) -> bool:
+        if not self._memory_available(self._descriptions[config_name]):
+            return False
+        if self._max_servers is None or not self._warm_pool_counts:
+            return True
+        return len(self._ports) < self._max_servers
+
+    def _refill_warm_pool(self) -> None:
+        for config_name in self._descriptions:
+            self._warm_pool.refill(config_name)
+
+    def _new_pooled_server(self, config_name: str) -> MegaMekServer:
+        return MegaMekServer(
+            config_name=config_name,
+            description=self._descriptions[config_name],
+            base=self.base_path,
+            port=self._acquire_port(),
+            templates=self._templates,
+            reclaimer=self._reclaimer,
+            scheduler=self._spawns,
+            class_data=self._class_data,
+            output_to_file=self._registry is not None,
+        )
+
+    def _acquire_port(self) -> int:
+        start = time.perf_counter()
         try:
-            while True:
-                yield await queue.get()
-                queue.task_done()
+            with TRACER.span("allocate_port"):
+                return self._ports.acquire()
         finally:
-            self._queues.remove(queue)
+            metrics.PORT_ALLOCATION.observe(time.perf_counter() - start)
+
+    def _release_server_port(self, server: MegaMekServer) -> None:
+        self._ports.release(server.port)
+
+    async def events(
+        self, since: Optional[int] = None, *, journal: Optional[str] = None, stats: bool = False
+    ) -> AsyncGenerator[Message, None]:
+        """
+        Events to send to a client.
+
+        It starts with the events after the sequence number `since` of
+        `journal` or, if it's not given or they are no longer available, with a
+        snapshot of the state. With `stats` it also gets the resource usage of
+        the servers.
+        """
+        missed = self._journal.since(since, journal) if since is not None else None
+        snapshot = self._stats_snapshot if stats else self._snapshot
+        subscriber = Subscriber(_MAX_PENDING_EVENTS, snapshot, missed)
+        self._subscribers.add(subscriber)
+        if stats:
+            self._stats_subscribers.add(subscriber)
+        try:
+            while (messages := await subscriber.messages()) is not None:
+                for message in messages:
+                    yield message
+        finally:
+            self._subscribers.discard(subscriber)
+            self._stats_subscribers.discard(subscriber)
+
+    def _snapshot(self) -> list[Message]:
+        seq = self._journal.last_seq
+        config_change = self._config_change()
+        config_change.seq = seq
+        return [
+            Message(config_change),
+            Message(
+                ServersSet(servers=self.all_servers_info(), seq=seq, journal=self._journal.epoch)
+            ),
+        ]
+
+    def _stats_snapshot(self) -> list[Message]:
+        history = self._stats.history()
+        return self._snapshot() + [
+            Message(ServerStats(id=id, samples=samples))
+            for id, samples in history.items()
+            if samples
+        ]
+
+    def _config_change(self) -> ConfigChange:
+        return ConfigChange(
+            max_servers=self._total_max_servers(), servers=self.server_descriptions()
+        )
+
+    def _total_max_servers(self) -> Optional[int]:
+        """Limit of servers counting the ones of the agents."""
+        max_servers = self._max_servers
+        for node in self._nodes:
+            if max_servers is None or node.max_servers is None:
+                return None
+            max_servers += node.max_servers
+        return max_servers
+
+    def _spawn_rank(self, server_id: UUID) -> float:
+        """Fair share: servers of creators with less servers start first."""
+        server = self._servers.get(server_id)
+        if server is None:
+            # Pooled servers wait for the ones that were asked for.
+            return math.inf
+        return sum(
+            1
+            for other in self._servers.values()
+            if other.creator == server.creator and other.state != ServerState.queued
+        )
+
+    def _queue_position_changed(self, server_id: UUID, position: int) -> None:
+        # Pooled servers are not shown.
+        if server_id in self._servers:
+            self._broadcast_event(ServerQueuePosition(id=server_id, position=position))
 
     def _state_changed(self, server_id: UUID, new_state: ServerState) -> None:
         self._broadcast_event(ServerStateChanged(id=server_id, new_state=new_state))
         if new_state == ServerState.dead:
             self._remove_server(server_id)
+        elif (server := self._servers.get(server_id)) is not None:
+            self._persist(server)
 
     def _remove_server(self, server_id: UUID) -> None:
         server = self._servers.get(server_id)
@@ -130,13 +804,39 @@ class Conductor:
             return
 
         del self._servers[server_id]
+        if self._registry is not None:
+            self._registry.remove(server_id)
+        self._activity.unwatch(server_id)
+        self._players.untrack(server_id)
+        self._stats.untrack(server_id)
         self._broadcast_event(ServerRemoved(id=server_id))
-        self._aquired_ports.remove(server.port)
+        self._ports.release(server.port)
+        # The freed slot (or memory) may be used to warm up another server.
+        self._refill_warm_pool()
 
     def _broadcast_event(self, event: Event) -> None:
-        for q in self._queues:
-            # TODO: limit number of pending events
-            q.put_nowait(event)
+        event.seq = self._journal.next_seq()
+        message = Message(event)
+        self._journal.append(message)
+        for subscriber in self._subscribers:
+            subscriber.push(message)
+
+
+def _spawn_limit(max_concurrent_spawns: Optional[int]) -> int:
+    return max_concurrent_spawns or os.cpu_count() or 1
+
+
+async def _is_still_running(entry: RegisteredServer) -> bool:
+    return (
+        entry.state == ServerState.running
+        and entry.pid is not None
+        and start_time(entry.pid) == entry.pid_start_time
+        and await is_port_open(entry.port)
+    )
+
+
+def _load(servers: int, max_servers: Optional[int]) -> tuple[float, int]:
+    return (servers / max_servers if max_servers else 0, servers)
 
 
 def server_limit_reached_error(max_servers: int) -> Error:
@@ -147,3 +847,19 @@ def server_limit_reached_error(max_servers: int) -> Error:
             "max_servers": max_servers,
         },
     )
+
+
+def memory_budget_exceeded_error(description: ServerDescription, available: int) -> Error:
+    required = description.memory_reservation() or 0
+    mib = 1024 * 1024
+    return Error(
+        name="memory_budget_exceeded",
+        message=(
+            "No hi ha prou memòria per a un altre servidor "
+            f"(en calen {required // mib} MiB i en queden {max(available, 0) // mib} MiB)."
+        ),
+        extra_data={
+            "required": required,
+            "available": available,
+        },
+    )
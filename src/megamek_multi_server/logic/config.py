@@ -1,11 +1,94 @@
+import json
+from datetime import timedelta
 from typing import Annotated, Optional
 
-from pydantic import AliasChoices, BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ByteSize, Field
 
 from .server_description import ServerDescription
 
 
+class AgentsConfig(BaseModel):
+    """Lets agents (on other hosts) connect and run servers."""
+
+    # `host:port` to listen on.
+    listen: str
+    token: str
+    # TLS certificate (and its key, if in another file), both PEM. Without
+    # them, the token and the commands are sent in plain text.
+    cert_file: Optional[str] = Field(default=None, alias="certFile")
+    key_file: Optional[str] = Field(default=None, alias="keyFile")
+
+
+class AgentConfig(BaseModel):
+    """Runs servers for a central conductor instead of serving the web."""
+
+    # `host:port` of the central conductor.
+    conductor: str
+    token: str
+    # Host players use to connect to the servers of this agent.
+    host: str
+    # Connects with TLS (see `AgentsConfig.cert_file`), trusting the system
+    # certificates or the ones in `ca_file`.
+    tls: bool = False
+    ca_file: Optional[str] = Field(default=None, alias="caFile")
+
+
+class Quota(BaseModel):
+    """Limits to what a user (or a group of users together) can use."""
+
+    max_servers: Optional[int] = Field(default=None, ge=0, alias="maxServers")
+    # Memory reserved by their servers (e.g. `"4GiB"`).
+    memory: Optional[ByteSize] = None
+
+
+class GroupQuota(Quota):
+    members: list[str]
+
+
+class QuotasConfig(BaseModel):
+    # For users without a quota of their own.
+    default: Quota = Field(default_factory=Quota)
+    users: dict[str, Quota] = Field(default_factory=dict)
+    groups: dict[str, GroupQuota] = Field(default_factory=dict)
+
+
 class Config(BaseModel):
     passwords: str
     servers: dict[str, ServerDescription]
     max_servers: Optional[int] = Field(default=None, gt=0, alias="maxServers")
+    # Number of idle servers kept running for each server description.
+    warm_pool: int = Field(default=0, ge=0, alias="warmPool")
+    # If idle servers of the pool count towards `max_servers`.
+    warm_pool_counts: bool = Field(default=False, alias="warmPoolCounts")
+    # Range of ports given to the servers: `[first, end)`.
+    port_range: tuple[int, int] = Field(default=(2346, 65535), alias="portRange")
+    # Stop servers that had no players connected for this long.
+    empty_server_timeout: Optional[timedelta] = Field(default=None, alias="emptyServerTimeout")
+    # Memory all the servers together can use (e.g. `"16GiB"`).
+    memory_budget: Optional[ByteSize] = Field(default=None, alias="memoryBudget")
+    quotas: QuotasConfig = Field(default_factory=QuotasConfig)
+    # Servers setting up or spawning at once (the rest are queued). By
+    # default, the number of CPUs.
+    max_concurrent_spawns: Optional[int] = Field(default=None, gt=0, alias="maxConcurrentSpawns")
+    # Servers started or stopped at once by bulk commands (and when shutting down).
+    bulk_concurrency: int = Field(default=4, gt=0, alias="bulkConcurrency")
+    # Speeds up starting the JVM with archives of the classes it loads (AppCDS),
+    # recorded by the first server of each `exe`. Needs JDK 13 or newer.
+    class_data_sharing: bool = Field(default=False, alias="classDataSharing")
+    # Lets scrapers read `/metrics` with `Authorization: Bearer <token>`.
+    metrics_token: Optional[str] = Field(default=None, alias="metricsToken")
+    # Spans kept to download from the admin page (`/trace`). No tracing if unset.
+    trace_buffer_size: Optional[int] = Field(default=None, gt=0, alias="traceBufferSize")
+    agents: Optional[AgentsConfig] = None
+    agent: Optional[AgentConfig] = None
+    # Unix socket of a conductor daemon. If set, the web doesn't run servers
+    # itself, so it can run in several workers.
+    conductor_socket: Optional[str] = Field(default=None, alias="conductorSocket")
+    # Keeps the servers running across restarts (instead of a temporary dir).
+    data_dir: Optional[str] = Field(default=None, alias="dataDir")
+
+
+def load_config(path: str) -> Config:
+    with open(path, mode="r") as f:
+        config = json.load(f)
+    return Config.model_validate(config)
@@ -0,0 +1,100 @@
+"""
+The conductor running in its own process (see `Config.conductor_socket`), so
+the web can run in several workers.
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+from typing import Optional
+
+from megamek_multi_server.utils.tasks import BackgroundTasks
+
+from .agent import serve_conductor
+from .agent_protocol import AgentEvent, receive, STREAM_LIMIT
+from .conductor import Conductor
+from .nodes import RemoteNode
+
+_INITIAL_RECONNECT_DELAY = timedelta(milliseconds=200)
+_MAX_RECONNECT_DELAY = timedelta(seconds=5)
+
+
+class DaemonListener:
+    """Lets web workers use the conductor of the daemon through a Unix socket."""
+
+    _conductor: Conductor
+    _path: str
+    _server: Optional[asyncio.Server]
+    _tasks: BackgroundTasks
+
+    def __init__(self, conductor: Conductor, path: str) -> None:
+        self._conductor = conductor
+        self._path = path
+        self._server = None
+        self._tasks = BackgroundTasks()
+
+    async def start(self) -> None:
+        if os.path.exists(self._path):
+            # Left by a previous run.
+            os.unlink(self._path)
+        self._server = await asyncio.start_unix_server(self._accept, self._path, limit=STREAM_LIMIT)
+        print(f"Waiting for web workers on {self._path}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        await self._tasks.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._tasks.spawn(serve_conductor(self._conductor, reader, writer, self._tasks))
+
+
+class DaemonLink:
+    """
+    Keeps a web worker connected to the daemon. Its servers are shown by the
+    (empty) conductor of the worker as the ones of a node in the same host.
+    """
+
+    _conductor: Conductor
+    _path: str
+    _task: Optional[asyncio.Task]
+
+    def __init__(self, conductor: Conductor, path: str) -> None:
+        self._conductor = conductor
+        self._path = path
+        self._task = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = _INITIAL_RECONNECT_DELAY
+        while True:
+            try:
+                await self._connect()
+                delay = _INITIAL_RECONNECT_DELAY
+            except Exception as e:
+                print(f"Connection to the conductor at {self._path} failed: {e!r}")
+            await asyncio.sleep(delay.total_seconds())
+            delay = min(delay * 2, _MAX_RECONNECT_DELAY)
+
+    async def _connect(self) -> None:
+        reader, writer = await asyncio.open_unix_connection(self._path, limit=STREAM_LIMIT)
+        node = RemoteNode(None, writer)
+        self._conductor.attach_node(node)
+        try:
+            while (message := await receive(reader)) is not None:
+                if isinstance(message, AgentEvent):
+                    self._conductor.node_event(node, message.event)
+        finally:
+            self._conductor.detach_node(node)
+            writer.close()
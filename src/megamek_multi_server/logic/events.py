@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 
 from .server import ServerState
 from .server_info import ServerInfo
+from .stats import StatsSample
 
 
 class EventType(str, Enum):
@@ -14,14 +15,20 @@ class EventType(str, Enum):
     servers_set = "servers_set"
     server_added = "server_added"
     server_state_changed = "server_state_changed"
+    server_players_changed = "server_players_changed"
     server_removed = "server_removed"
     error = "error"
+    server_stats = "server_stats"
+    bulk_progress = "bulk_progress"
+    server_queue_position = "server_queue_position"
 
 
 class BaseEvent(BaseModel):
     """Shared data for all events."""
 
     event_timestamp: datetime = Field(default_factory=datetime.now)
+    # Position in the event stream. Used to resume a subscription.
+    seq: Optional[int] = None
 
 
 class ConfigChange(BaseEvent):
@@ -29,6 +36,8 @@ class ConfigChange(BaseEvent):
 
     event_type: Literal[EventType.config_changed] = Field(default=EventType.config_changed)
     max_servers: Optional[int]
+    # Names of the server descriptions that can be created.
+    servers: list[str] = Field(default_factory=list)
 
 
 class ServersSet(BaseEvent):
@@ -36,6 +45,8 @@ class ServersSet(BaseEvent):
 
     event_type: Literal[EventType.servers_set] = Field(default=EventType.servers_set)
     servers: list[ServerInfo]
+    # Journal of `seq` in snapshots, to resume with it (see `Journal.epoch`).
+    journal: Optional[str] = None
 
 
 class ServerAdded(BaseEvent):
@@ -55,6 +66,26 @@ class ServerStateChanged(BaseEvent):
     new_state: ServerState
 
 
+class ServerQueuePosition(BaseEvent):
+    """A queued server moved in the queue (1 is the next one to start)."""
+
+    event_type: Literal[EventType.server_queue_position] = Field(
+        default=EventType.server_queue_position
+    )
+    id: UUID
+    position: int
+
+
+class ServerPlayersChanged(BaseEvent):
+    """The number of players connected to a server changed."""
+
+    event_type: Literal[EventType.server_players_changed] = Field(
+        default=EventType.server_players_changed
+    )
+    id: UUID
+    player_count: int
+
+
 class ServerRemoved(BaseEvent):
     """A server was removed and no longer exists."""
 
@@ -71,7 +102,49 @@ class Error(BaseEvent):
     extra_data: dict[str, Any]
 
 
+class ServerStats(BaseEvent):
+    """
+    Resource usage of a server. Only sent to clients that ask for it, and
+    without sequence number.
+    """
+
+    event_type: Literal[EventType.server_stats] = Field(default=EventType.server_stats)
+    id: UUID
+    # Usually the last one. The first event has the history.
+    samples: list[StatsSample]
+
+
+class BulkItem(BaseModel):
+    """Result of one of the servers of a bulk command."""
+
+    id: UUID
+    # `None` if it went well.
+    error: Optional[str] = None
+
+
+class BulkProgress(BaseEvent):
+    """
+    Progress of a bulk command. Sent each time one of its servers is done (or
+    once if there is none).
+    """
+
+    event_type: Literal[EventType.bulk_progress] = Field(default=EventType.bulk_progress)
+    bulk_id: UUID
+    done: int
+    total: int
+    item: Optional[BulkItem]
+
+
 Event = Annotated[
-    ConfigChange | ServersSet | ServerAdded | ServerStateChanged | ServerRemoved | Error,
+    ConfigChange
+    | ServersSet
+    | ServerAdded
+    | ServerStateChanged
+    | ServerPlayersChanged
+    | ServerRemoved
+    | Error
+    | ServerStats
+    | BulkProgress
+    | ServerQueuePosition,
     Field(discriminator="event_type"),
 ]
@@ -1,20 +1,23 @@
-import json
 from collections.abc import AsyncGenerator
 from enum import Enum
-from pathlib import Path
 from typing import Optional
 
-from aiofiles.tempfile import TemporaryDirectory
 from pydantic import RootModel
 from quart import current_app, Quart
 
 from megamek_multi_server.logic.server_description import ServerDescription
+from megamek_multi_server.utils.watched_file import WatchedFile
 
+from . import metrics
 from .auth import FileAuth
-from .commands import Command, CreateServer, DestroyServer
+from .commands import Command, CreateServer, CreateServers, DestroyServer, DestroyServers
 from .conductor import Conductor
-from .config import Config
-from .events import Event
+from .config import Config, load_config
+from .daemon import DaemonLink
+from .nodes import AgentListener
+from .registry import server_storage, temporary_storage
+from .tracing import TRACER
+from .wire import Message
 
 _EXT_CODE = "QUART_MEGAMEK"
 _CONFIG_KEY = "MEGAMEK_MULTI_SERVER"
@@ -28,6 +31,7 @@ class _ConductorState(str, Enum):
 
 class QuartMegaMek:
     _conductor: Conductor | _ConductorState
+    _config_file: WatchedFile[Config] | None
     _config: Config | None
     _file_auth: FileAuth | None
 
@@ -48,11 +52,11 @@ class QuartMegaMek:
         if config_file is None:
             raise Exception(f"No config file configured. Please set QUART_{_CONFIG_KEY} in env")
 
-        with open(config_file, mode="r") as f:
-            config = json.load(f)
-
-        self._config = Config.model_validate(config)
+        self._config_file = WatchedFile(config_file, load_config)
+        self._config_file.subscribe(self._config_changed)
+        self._config = self._config_file.value
         self._file_auth = FileAuth(self._config.passwords)
+        TRACER.configure(self._config.trace_buffer_size)
 
         if self._conductor == _ConductorState.ready:
             self._conductor = _ConductorState.starting
@@ -62,13 +66,56 @@ class QuartMegaMek:
 
     async def _run_conductor(self) -> AsyncGenerator[None, None]:
         assert self._config is not None
-        async with TemporaryDirectory() as temp_dir:
-            self._conductor = Conductor(
-                Path(temp_dir), self._config.servers, self._config.max_servers
-            )
+        assert self._config_file is not None
+        assert self._file_auth is not None
+        self._config_file.start()
+        self._file_auth.start()
+        if self._config.conductor_socket is not None:
+            # Only the daemon uses the storage of the servers (and cleans it up).
+            storage = temporary_storage()
+        else:
+            storage = server_storage(self._config)
+        async with storage as (servers_path, registry):
+            daemon = None
+            agents = None
+            if self._config.conductor_socket is not None:
+                # The daemon runs the servers. Here they are only shown.
+                conductor = Conductor(servers_path, {}, 0)
+                daemon = DaemonLink(conductor, self._config.conductor_socket)
+                daemon.start()
+            else:
+                conductor = Conductor.from_config(servers_path, self._config, registry=registry)
+                await conductor.restore()
+                if self._config.agents is not None:
+                    agents = AgentListener.from_config(conductor, self._config.agents)
+                    await agents.start()
+            self._conductor = conductor
+            conductor.start()
             yield
-            await self._conductor.shutdown()
+            if daemon is not None:
+                await daemon.close()
+            if agents is not None:
+                await agents.close()
+            await conductor.shutdown()
             self._conductor = _ConductorState.closed
+        await self._file_auth.close()
+        await self._config_file.close()
+
+    def _config_changed(self, config: Config) -> None:
+        assert self._config is not None
+        if config.passwords != self._config.passwords:
+            print("The passwords file changed. It will be used after restarting.")
+        if config.port_range != self._config.port_range:
+            print("The port range changed. It will be used after restarting.")
+        if config.agents != self._config.agents:
+            print("The agents configuration changed. It will be used after restarting.")
+        if config.conductor_socket != self._config.conductor_socket:
+            print("The conductor socket changed. It will be used after restarting.")
+        self._config = config
+        TRACER.configure(config.trace_buffer_size)
+        if isinstance(self._conductor, Conductor) and config.conductor_socket is None:
+            # Otherwise the daemon reconfigures itself.
+            self._conductor.reconfigure(config)
 
     @staticmethod
     def current() -> "QuartMegaMek":
@@ -94,17 +141,34 @@ class QuartMegaMek:
         return ConfigOptions(current.server_descriptions())
 
     @staticmethod
-    def events() -> AsyncGenerator[Event, None]:
-        return QuartMegaMek._current_conductor().events()
+    def metrics_token() -> Optional[str]:
+        config = QuartMegaMek.current()._config
+        return config.metrics_token if config is not None else None
+
+    @staticmethod
+    def metrics() -> str:
+        """Current metrics in the Prometheus text format."""
+        QuartMegaMek._current_conductor().update_metrics()
+        return metrics.REGISTRY.render()
+
+    @staticmethod
+    def events(
+        since: Optional[int] = None, *, journal: Optional[str] = None, stats: bool = False
+    ) -> AsyncGenerator[Message, None]:
+        return QuartMegaMek._current_conductor().events(since, journal=journal, stats=stats)
 
     @staticmethod
     async def apply_command(command: Command, auth_id: Optional[str]) -> None:
         if isinstance(command, CreateServer):
-            await QuartMegaMek._current_conductor().start_server(
-                command.server, command.id, auth_id
-            )
+            QuartMegaMek._current_conductor().create_server(command.server, command.id, auth_id)
         elif isinstance(command, DestroyServer):
             await QuartMegaMek._current_conductor().stop_server(command.id)
+        elif isinstance(command, CreateServers):
+            QuartMegaMek._current_conductor().create_servers(
+                command.server, command.count, auth_id, command.bulk_id
+            )
+        elif isinstance(command, DestroyServers):
+            QuartMegaMek._current_conductor().destroy_servers(command.filter, command.bulk_id)
 
 
 ConfigOptions = RootModel[list[str]]
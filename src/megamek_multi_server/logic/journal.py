@@ -0,0 +1,50 @@
+import secrets
+import time
+from collections import deque
+from itertools import islice
+
+from .wire import Message
+
+
+class Journal:
+    """
+    Last broadcast events with their sequence numbers, so
+    clients can resume a subscription and only get what they missed.
+    """
+
+    # Tells apart the numbers of different journals (e.g. of other web
+    # workers, or of a previous run), which may overlap.
+    epoch: str
+    _entries: deque[Message]
+    _last_seq: int
+
+    def __init__(self, size: int) -> None:
+        self.epoch = secrets.token_hex(8)
+        self._entries = deque(maxlen=size)
+        # Starting from the time makes numbers of a previous run (before a
+        # restart) be lower, so they are never mistaken with current ones.
+        self._last_seq = time.time_ns() // 1_000_000
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def next_seq(self) -> int:
+        self._last_seq += 1
+        return self._last_seq
+
+    def append(self, message: Message) -> None:
+        """Adds the message of the event with the last sequence number."""
+        self._entries.append(message)
+
+    def since(self, seq: int, epoch: str | None) -> list[Message] | None:
+        """
+        Messages after `seq` of journal `epoch`, or `None` if they are no
+        longer known (or `seq` is from another journal).
+        """
+        if epoch != self.epoch:
+            return None
+        missed = self._last_seq - seq
+        if missed < 0 or missed > len(self._entries):
+            return None
+        return list(islice(self._entries, len(self._entries) - missed, None))
@@ -0,0 +1,57 @@
+"""Metrics of the whole application (see `/metrics`)."""
+
+from megamek_multi_server.utils.metrics import Counter, Gauge, Histogram, Labeled, Registry
+
+REGISTRY = Registry()
+
+_SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+_FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+_LOGIN_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+STATE_DURATION = REGISTRY.register(
+    Labeled(
+        "state",
+        lambda: Histogram(
+            "megamek_server_state_seconds",
+            "Time servers spent in a state before moving to the next one.",
+            _SLOW_BUCKETS,
+        ),
+    )
+)
+SPAWN_FAILURES = REGISTRY.register(
+    Counter("megamek_server_spawn_failures_total", "Servers that could not be started.")
+)
+PORT_ALLOCATION = REGISTRY.register(
+    Histogram("megamek_port_allocation_seconds", "Time to find a free port.", _FAST_BUCKETS)
+)
+LOGIN_VERIFICATION = REGISTRY.register(
+    Histogram(
+        "megamek_login_verification_seconds",
+        "Time to check a password (including waiting for a thread).",
+        _LOGIN_BUCKETS,
+    )
+)
+WEBSOCKETS = REGISTRY.register(
+    Gauge("megamek_websockets", "Clients connected to the events websocket.")
+)
+
+# Updated when rendering.
+SERVERS = REGISTRY.register(Gauge("megamek_servers", "Servers in use (excluding the warm pool)."))
+MAX_SERVERS = REGISTRY.register(
+    Gauge("megamek_max_servers", "Maximum number of servers (NaN if unlimited).")
+)
+MEMORY_USED = REGISTRY.register(
+    Gauge("megamek_memory_used_bytes", "Memory reserved or used by the servers.")
+)
+MEMORY_BUDGET = REGISTRY.register(
+    Gauge("megamek_memory_budget_bytes", "Memory the servers can use (NaN if unlimited).")
+)
+WARM_POOL = REGISTRY.register(Gauge("megamek_warm_pool_servers", "Servers in the warm pool."))
+PENDING_EVENTS = REGISTRY.register(
+    Labeled(
+        "subscriber",
+        lambda: Gauge(
+            "megamek_subscriber_pending_events", "Events waiting to be sent to a client."
+        ),
+    )
+)
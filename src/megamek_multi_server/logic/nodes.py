@@ -0,0 +1,202 @@
+import asyncio
+import secrets
+import ssl
+from typing import Any, Optional, TYPE_CHECKING
+from uuid import UUID
+
+from megamek_multi_server.utils.tasks import BackgroundTasks
+
+from .agent_protocol import AgentEvent, Hello, receive, send, StartServer, StopServer, STREAM_LIMIT
+from .config import AgentsConfig
+from .events import Error, Event, ServerAdded, ServerRemoved, ServerStateChanged
+from .server import ServerState
+from .server_info import ServerInfo
+
+if TYPE_CHECKING:
+    from .conductor import Conductor
+
+# Time an agent has to introduce itself.
+_HELLO_TIMEOUT = 10
+
+
+class RemoteNode:
+    """An agent connected to the central conductor, and what it is running."""
+
+    # `None` if it's on this same host.
+    host: Optional[str]
+    max_servers: Optional[int]
+    descriptions: list[str]
+    servers: dict[UUID, ServerInfo]
+    _writer: asyncio.StreamWriter
+    # Commands sent to the agent, resolved once its events tell how they ended.
+    _starting: dict[UUID, asyncio.Future[Optional[Error]]]
+    _stopping: dict[UUID, asyncio.Future[None]]
+
+    def __init__(self, host: Optional[str], writer: asyncio.StreamWriter) -> None:
+        self.host = host
+        # Known once the agent sends its configuration.
+        self.max_servers = 0
+        self.descriptions = []
+        self.servers = {}
+        self._writer = writer
+        self._starting = {}
+        self._stopping = {}
+
+    @property
+    def server_count(self) -> int:
+        """Servers it runs, including the ones it was just asked to start."""
+        return len(self.servers.keys() | self._starting.keys())
+
+    def can_start(self, config_name: str) -> bool:
+        return config_name in self.descriptions and (
+            self.max_servers is None or self.server_count < self.max_servers
+        )
+
+    async def start_server(
+        self, config_name: str, id: UUID, creator: Optional[str]
+    ) -> Optional[Error]:
+        """Asks the agent to start a server. Returns once running, or why it can't."""
+        future = asyncio.get_running_loop().create_future()
+        self._starting[id] = future
+        try:
+            await send(self._writer, StartServer(config_name=config_name, id=id, creator=creator))
+            return await future
+        finally:
+            self._starting.pop(id, None)
+
+    async def stop_server(self, id: UUID) -> None:
+        """Asks the agent to stop a server. Returns once it's removed."""
+        if (future := self._stopping.get(id)) is not None:
+            # Already asked.
+            await asyncio.shield(future)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._stopping[id] = future
+        try:
+            await send(self._writer, StopServer(id=id))
+            await asyncio.shield(future)
+        finally:
+            self._stopping.pop(id, None)
+
+    def settle(self, event: Event) -> bool:
+        """
+        Resolves the commands that `event` ends. Returns if it's the error of
+        a start, which is reported by whoever started it.
+        """
+        if isinstance(event, Error):
+            id = _error_id(event)
+            if id is None or (future := self._starting.get(id)) is None:
+                return False
+            _resolve(future, event)
+            return True
+        if isinstance(event, ServerAdded) and event.info.state == ServerState.running:
+            # E.g. it was in a warm pool.
+            if (future := self._starting.get(event.info.id)) is not None:
+                _resolve(future, None)
+        elif isinstance(event, ServerStateChanged) and event.new_state == ServerState.running:
+            if (future := self._starting.get(event.id)) is not None:
+                _resolve(future, None)
+        elif isinstance(event, ServerRemoved):
+            if (future := self._starting.get(event.id)) is not None:
+                _fail(future, RuntimeError("The server was removed before running"))
+            if (stopped := self._stopping.get(event.id)) is not None:
+                _resolve(stopped, None)
+        return False
+
+    def disconnected(self) -> None:
+        """Fails the commands still waiting (their outcome won't be known)."""
+        futures: list[asyncio.Future] = [*self._starting.values(), *self._stopping.values()]
+        for future in futures:
+            _fail(future, ConnectionError(f"Agent {self.host} disconnected"))
+
+
+def _error_id(error: Error) -> Optional[UUID]:
+    # Set by the conductor of the agent (see `Conductor.start_server`).
+    try:
+        return UUID(str(error.extra_data["id"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _resolve(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _fail(future: asyncio.Future, error: Exception) -> None:
+    if not future.done():
+        future.set_exception(error)
+
+
+class AgentListener:
+    """Accepts connections of agents and hands them to the conductor."""
+
+    _conductor: "Conductor"
+    _host: str
+    _port: int
+    _token: str
+    _ssl: Optional[ssl.SSLContext]
+    _server: Optional[asyncio.Server]
+    _tasks: BackgroundTasks
+
+    def __init__(
+        self,
+        conductor: "Conductor",
+        listen: str,
+        token: str,
+        *,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ) -> None:
+        host, port = listen.rsplit(":", 1)
+        self._conductor = conductor
+        self._host = host
+        self._port = int(port)
+        self._token = token
+        self._ssl = ssl_context
+        self._server = None
+        self._tasks = BackgroundTasks()
+
+    @staticmethod
+    def from_config(conductor: "Conductor", config: AgentsConfig) -> "AgentListener":
+        context = None
+        if config.cert_file is not None:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(config.cert_file, config.key_file)
+        return AgentListener(conductor, config.listen, config.token, ssl_context=context)
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._accept, self._host, self._port, limit=STREAM_LIMIT, ssl=self._ssl
+        )
+        print(f"Waiting for agents on {self._host}:{self._port}")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        await self._tasks.close()
+        if self._server is not None:
+            await self._server.wait_closed()
+            self._server = None
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._tasks.spawn(self._serve(reader, writer))
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            hello = await asyncio.wait_for(receive(reader), _HELLO_TIMEOUT)
+            if not isinstance(hello, Hello) or not secrets.compare_digest(hello.token, self._token):
+                print(f"Rejected agent from {writer.get_extra_info('peername')}")
+                return
+
+            node = RemoteNode(hello.host, writer)
+            print(f"Agent {node.host} connected")
+            self._conductor.attach_node(node)
+            try:
+                while (message := await receive(reader)) is not None:
+                    if isinstance(message, AgentEvent):
+                        self._conductor.node_event(node, message.event)
+            finally:
+                print(f"Agent {node.host} disconnected")
+                self._conductor.detach_node(node)
+        finally:
+            writer.close()
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import UUID
+
+from megamek_multi_server.utils.net import established_connections
+
+
+class PlayerCounter:
+    """
+    Number of players connected to each server, sampled for all of them at
+    once from the established TCP connections to their ports.
+    """
+
+    _counts: dict[UUID, int]
+    _last_seen: dict[UUID, datetime]
+
+    def __init__(self) -> None:
+        self._counts = {}
+        self._last_seen = {}
+
+    def track(self, id: UUID) -> None:
+        """Starts counting players. It counts as if some were just seen."""
+        self._counts[id] = 0
+        self._last_seen[id] = datetime.now(timezone.utc)
+
+    def untrack(self, id: UUID) -> None:
+        self._counts.pop(id, None)
+        self._last_seen.pop(id, None)
+
+    def player_count(self, id: UUID) -> int | None:
+        return self._counts.get(id)
+
+    def last_seen(self, id: UUID) -> datetime | None:
+        """Last time the server had some player connected."""
+        return self._last_seen.get(id)
+
+    async def sample(self, ports: dict[UUID, int]) -> dict[UUID, int]:
+        """Samples the given servers. Returns the ones whose count changed."""
+        ports = {id: port for id, port in ports.items() if id in self._counts}
+        by_port = await asyncio.to_thread(established_connections, set(ports.values()))
+        if by_port is None:
+            return {}
+
+        now = datetime.now(timezone.utc)
+        changed = {}
+        for id, port in ports.items():
+            if id not in self._counts:
+                # Removed while sampling.
+                continue
+            count = by_port.get(port, 0)
+            if count > 0:
+                self._last_seen[id] = now
+            if self._counts[id] != count:
+                self._counts[id] = count
+                changed[id] = count
+        return changed
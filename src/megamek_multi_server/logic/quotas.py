@@ -0,0 +1,84 @@
+"""Limits on what each user (or group of users) can use."""
+
+from collections.abc import Iterable
+from typing import NamedTuple, Optional
+
+from .config import Quota, QuotasConfig
+from .events import Error
+
+_MIB = 1024 * 1024
+
+
+class Usage(NamedTuple):
+    """A server, as counted against the quota of its creator."""
+
+    creator: Optional[str]
+    # Memory reserved by the server (in bytes).
+    memory: int
+
+
+def check_quotas(
+    quotas: QuotasConfig, creator: Optional[str], servers: Iterable[Usage], required: int
+) -> Optional[Error]:
+    """Why `creator` can't have another server reserving `required` bytes, if so."""
+    if creator is None:
+        return None
+    servers = list(servers)
+    quota = quotas.users.get(creator, quotas.default)
+    if (error := _check(quota, servers, {creator}, required, creator, None)) is not None:
+        return error
+    for name, group in quotas.groups.items():
+        if creator not in group.members:
+            continue
+        members = set(group.members)
+        if (error := _check(group, servers, members, required, creator, name)) is not None:
+            return error
+    return None
+
+
+def _check(
+    quota: Quota,
+    servers: list[Usage],
+    members: set[str],
+    required: int,
+    creator: str,
+    group: Optional[str],
+) -> Optional[Error]:
+    theirs = [server for server in servers if server.creator in members]
+    if quota.max_servers is not None and len(theirs) >= quota.max_servers:
+        return server_quota_error(creator, group, quota.max_servers)
+    if quota.memory is not None:
+        available = int(quota.memory) - sum(server.memory for server in theirs)
+        if required > available:
+            return memory_quota_error(creator, group, required, available)
+    return None
+
+
+def server_quota_error(creator: str, group: Optional[str], max_servers: int) -> Error:
+    who = f"El grup {group}" if group is not None else creator
+    return Error(
+        name="server_quota_exceeded",
+        message=f"{who} ha arribat al seu límit de servidors ({max_servers}).",
+        extra_data={
+            "creator": creator,
+            "group": group,
+            "max_servers": max_servers,
+        },
+    )
+
+
+def memory_quota_error(creator: str, group: Optional[str], required: int, available: int) -> Error:
+    who = f"El grup {group}" if group is not None else creator
+    return Error(
+        name="memory_quota_exceeded",
+        message=(
+            f"{who} no té prou memòria per a un altre servidor "
+            f"(en calen {required // _MIB} MiB i en queden {max(available, 0) // _MIB} MiB)."
+        ),
+        extra_data={
+            "creator": creator,
+            "group": group,
+            "required": required,
+            "available": available,
+        },
+    )
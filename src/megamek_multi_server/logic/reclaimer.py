@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+import os
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+# Files removed in each trip to a thread, and pause between trips, so deleting
+# large trees does not starve the disk.
+_BATCH_SIZE = 500
+_BATCH_PAUSE: timedelta = timedelta(milliseconds=50)
+
+
+class Reclaimer:
+    """
+    Deletes directories of servers in the background. They are first moved to
+    a trash directory, so whatever is left there is deleted after restarting.
+    """
+
+    _trash: Path
+    # Paths that couldn't be moved to the trash, deleted where they are.
+    _in_place: list[Path]
+    _counter: itertools.count
+    _pending: asyncio.Event
+    _worker: Optional[asyncio.Task]
+
+    def __init__(self, trash: Path) -> None:
+        self._trash = trash
+        self._in_place = []
+        self._counter = itertools.count()
+        self._pending = asyncio.Event()
+        self._worker = None
+
+    def start(self) -> None:
+        self._trash.mkdir(parents=True, exist_ok=True)
+        self._pending.set()
+        self._worker = asyncio.create_task(self._work())
+
+    async def close(self) -> None:
+        """Stops deleting. What is left is deleted after starting again."""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def reclaim(self, path: Path) -> None:
+        """Moves `path` to the trash. Only a rename, so it does not wait."""
+        self._trash.mkdir(parents=True, exist_ok=True)
+        try:
+            path.rename(self._trash / f"{path.name}.{next(self._counter)}")
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            # E.g. in another file system. Deleted in place instead.
+            print(f"Could not move {path} to the trash ({e}). Deleting it where it is.")
+            self._in_place.append(path)
+        self._pending.set()
+
+    async def _work(self) -> None:
+        while True:
+            await self._pending.wait()
+            self._pending.clear()
+            in_place, self._in_place = self._in_place, []
+            entries = await asyncio.to_thread(os.listdir, self._trash)
+            for path in in_place + [self._trash / entry for entry in entries]:
+                try:
+                    while not await asyncio.to_thread(_delete_some, path, _BATCH_SIZE):
+                        await asyncio.sleep(_BATCH_PAUSE.total_seconds())
+                except OSError as e:
+                    print(f"Could not delete {path}: {e}")
+
+
+def _delete_some(path: Path, limit: int) -> bool:
+    """Deletes up to `limit` entries of `path`, deepest first. `True` once it's gone."""
+    if path.is_symlink() or not path.is_dir():
+        path.unlink(missing_ok=True)
+        return True
+    deleted = 0
+    for parent, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            _ignore_missing(os.unlink, os.path.join(parent, name))
+            deleted += 1
+        for name in dirs:
+            # `os.walk` lists links to directories as directories.
+            child = os.path.join(parent, name)
+            if os.path.islink(child):
+                _ignore_missing(os.unlink, child)
+            else:
+                _ignore_missing(os.rmdir, child)
+            deleted += 1
+        if deleted >= limit:
+            return False
+    _ignore_missing(os.rmdir, str(path))
+    return True
+
+
+def _ignore_missing(remove: Callable[[str], None], path: str) -> None:
+    try:
+        remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,128 @@
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Optional
+from uuid import UUID
+
+from aiofiles.tempfile import TemporaryDirectory
+from pydantic import BaseModel
+
+from .config import Config
+from .server import ServerState
+from .server_description import ServerDescription
+
+
+class RegisteredServer(BaseModel):
+    """What's needed to take control of a server again after a restart."""
+
+    id: UUID
+    config_name: str
+    description: ServerDescription
+    path: str
+    port: int
+    pid: Optional[int]
+    # Tells apart a reused pid (see `procfs.start_time`).
+    pid_start_time: Optional[int]
+    creator: Optional[str]
+    creation_timestamp: datetime
+    state: ServerState
+
+
+class _Record(BaseModel):
+    id: UUID
+    # `None` if the server was removed.
+    server: Optional[RegisteredServer] = None
+
+
+class ServerRegistry:
+    """
+    Servers being run, stored in a file so they survive restarts.
+
+    Changes are appended to the file, so recording one doesn't depend on the
+    number of servers. It's compacted when loaded.
+    """
+
+    _path: Path
+    _file: Optional[IO[str]]
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._file = None
+
+    def load(self) -> list[RegisteredServer]:
+        """Servers recorded by previous runs. Must be called before recording."""
+        servers: dict[UUID, RegisteredServer] = {}
+        try:
+            with open(self._path, "r") as f:
+                for line in f:
+                    try:
+                        record = _Record.model_validate_json(line)
+                    except ValueError:
+                        # Probably a write cut short by a crash.
+                        continue
+                    if record.server is None:
+                        servers.pop(record.id, None)
+                    else:
+                        servers[record.id] = record.server
+        except FileNotFoundError:
+            pass
+
+        compacted = self._path.with_suffix(".tmp")
+        with open(compacted, "w") as f:
+            for server in servers.values():
+                f.write(_Record(id=server.id, server=server).model_dump_json() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(compacted, self._path)
+        self._file = open(self._path, "a")
+        return list(servers.values())
+
+    def record(self, server: RegisteredServer) -> None:
+        self._write(_Record(id=server.id, server=server))
+
+    def remove(self, id: UUID) -> None:
+        self._write(_Record(id=id))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: _Record) -> None:
+        if self._file is None:
+            raise RuntimeError("The registry has not been loaded")
+        self._file.write(record.model_dump_json() + "\n")
+        self._file.flush()
+
+
+@asynccontextmanager
+async def server_storage(config: Config) -> AsyncIterator[tuple[Path, Optional[ServerRegistry]]]:
+    """
+    Directory where servers are set up, and the registry that lets them
+    survive restarts (only if `data_dir` is configured).
+    """
+    if config.data_dir is None:
+        async with temporary_storage() as storage:
+            yield storage
+        return
+
+    data_dir = Path(config.data_dir)
+    base_path = data_dir / "servers"
+    base_path.mkdir(parents=True, exist_ok=True)
+    registry = ServerRegistry(data_dir / "registry.jsonl")
+    try:
+        yield base_path, registry
+    finally:
+        registry.close()
+
+
+@asynccontextmanager
+async def temporary_storage() -> AsyncIterator[tuple[Path, Optional[ServerRegistry]]]:
+    """
+    A directory of our own that's deleted afterwards (e.g. for web workers,
+    which only show the servers of a daemon and must not touch its directory).
+    """
+    async with TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir), None
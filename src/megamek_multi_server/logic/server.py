@@ -1,7 +1,10 @@
 import asyncio
-import os.path
-from asyncio.subprocess import Process
-from datetime import datetime, timedelta, timezone
+import re
+import time
+from asyncio import Future
+from asyncio.subprocess import PIPE, Process, STDOUT
+from contextlib import AbstractContextManager
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
 from typing import Callable, Optional
@@ -9,16 +12,25 @@ from uuid import UUID, uuid4
 
 import aioshutil
 
-from megamek_multi_server.utils.files import directory_modified
 from megamek_multi_server.utils.net import wait_until_port_open
-from megamek_multi_server.utils.sleep import schedule_at
+from megamek_multi_server.utils.process import AdoptedProcess, follow_file, forward_lines
 
+from . import metrics
+from .class_data import ClassDataArchives, with_options
+from .reclaimer import Reclaimer
 from .server_description import ServerDescription
+from .setup_templates import SetupTemplates
+from .spawn_scheduler import SpawnScheduler
+from .tracing import TRACER
 
 StateChanged = Callable[[UUID, "ServerState"], None]
 
 _MAX_WAIT_FOR_MM: timedelta = timedelta(minutes=1)
-_AUTO_STOP_SERVER: timedelta = timedelta(minutes=30)
+# MegaMek logs something like `s: hostname = '...' port = 2346` once listening.
+_LISTENING_LOG = re.compile(rb"\bport\s*=\s*(\d+)")
+# Output of servers that may outlive us (in their directory). A pipe would
+# break once we restart.
+_OUTPUT_LOG = "output.log"
 
 
 class MegaMekServer:
@@ -29,12 +41,21 @@ class MegaMekServer:
     _port: int
     _creator: Optional[str]
     _creation_timestamp: datetime
+    _templates: Optional[SetupTemplates]
+    _reclaimer: Optional[Reclaimer]
+    _scheduler: Optional[SpawnScheduler]
+    _class_data: Optional[ClassDataArchives]
+    # Sends the output to `_OUTPUT_LOG` instead of a pipe.
+    _output_to_file: bool
 
     _state_changed: Optional[StateChanged]
 
-    _proc: Optional[Process]
+    _proc: Optional[Process | AdoptedProcess]
+    _output: Optional[asyncio.Task]
+    # Added to the `exe` of the running process (see `ClassDataArchives`).
+    _jvm_options: list[str]
     _state: "ServerState"
-    _auto_stop: asyncio.Task | None
+    _state_since: float
 
     @property
     def id(self) -> UUID:
@@ -44,14 +65,26 @@ class MegaMekServer:
     def config_name(self) -> str:
         return self._config_name
 
+    @property
+    def description(self) -> ServerDescription:
+        return self._server_description
+
     @property
     def mm_version(self) -> str:
         return self._server_description.version
 
+    @property
+    def path(self) -> Path:
+        return self._path
+
     @property
     def port(self) -> int:
         return self._port
 
+    @property
+    def pid(self) -> Optional[int]:
+        return self._proc.pid if self._proc is not None else None
+
     @property
     def creator(self) -> Optional[str]:
         return self._creator
@@ -76,6 +109,11 @@ class MegaMekServer:
         state_changed: Optional[StateChanged] = None,
         id: Optional[UUID] = None,
         creator: Optional[str] = None,
+        templates: Optional[SetupTemplates] = None,
+        reclaimer: Optional[Reclaimer] = None,
+        scheduler: Optional[SpawnScheduler] = None,
+        class_data: Optional[ClassDataArchives] = None,
+        output_to_file: bool = False,
     ) -> None:
         self._uuid = id or uuid4()
         self._config_name = config_name
@@ -84,12 +122,61 @@ class MegaMekServer:
         self._port = port
         self._creator = creator
         self._creation_timestamp = datetime.now()
+        self._templates = templates
+        self._reclaimer = reclaimer
+        self._scheduler = scheduler
+        self._class_data = class_data
+        self._output_to_file = output_to_file
 
         self._state_changed = state_changed
 
         self._proc = None
+        self._output = None
+        self._jvm_options = []
         self._state = ServerState.fresh
-        self._auto_stop = None
+        self._state_since = time.monotonic()
+
+    @staticmethod
+    def adopt(
+        id: UUID,
+        config_name: str,
+        description: ServerDescription,
+        path: Path,
+        port: int,
+        pid: int,
+        *,
+        creator: Optional[str],
+        creation_timestamp: datetime,
+        state_changed: Optional[StateChanged] = None,
+        reclaimer: Optional[Reclaimer] = None,
+    ) -> "MegaMekServer":
+        """Takes control of a running server started before a restart."""
+        server = MegaMekServer(
+            config_name,
+            description,
+            path.parent,
+            port,
+            id=id,
+            creator=creator,
+            reclaimer=reclaimer,
+            output_to_file=True,
+        )
+        server._path = path
+        server._creation_timestamp = creation_timestamp
+        proc = AdoptedProcess(pid)
+        server._proc = proc
+        server._state = ServerState.running
+        server._state_changed = state_changed
+        # Only what it writes from now on (the rest was already shown).
+        server._output = asyncio.create_task(
+            follow_file(
+                path / _OUTPUT_LOG,
+                lambda line: None,
+                lambda: proc.returncode is not None,
+                from_end=True,
+            )
+        )
+        return server
 
     async def start(self) -> None:
         """Starts the server with some config."""
@@ -97,34 +184,132 @@ class MegaMekServer:
             raise RuntimeError("Trying to start server where the state is not fresh")
 
         print(f"Starting server {self.id} on {self._port} at {self._path}")
-        self._set_state(ServerState.setting_up)
-        await self._set_up()
-        self._set_state(ServerState.spawning)
-        await self._spawn()
+        with self._traced(), TRACER.span("start"):
+            if self._scheduler is None:
+                await self._launch()
+            else:
+                self._set_state(ServerState.queued)
+                async with self._scheduler.slot(self._uuid):
+                    await self._launch()
         self._set_state(ServerState.running)
 
+    def claim(
+        self,
+        *,
+        state_changed: Optional[StateChanged],
+        id: Optional[UUID] = None,
+        creator: Optional[str] = None,
+    ) -> None:
+        """Hands a running server (e.g. one that was waiting in a pool) to a creator."""
+        if self._state != ServerState.running:
+            raise RuntimeError("Trying to claim a server that's not running")
+
+        self._uuid = id or self._uuid
+        self._creator = creator
+        self._creation_timestamp = datetime.now()
+        self._state_changed = state_changed
+
+    async def abort(self) -> None:
+        """Kills and cleans up the server regardless of its state."""
+        with self._traced(), TRACER.span("abort"):
+            await self._abort()
+
+    async def _abort(self) -> None:
+        if self._proc is not None and self._proc.returncode is None:
+            try:
+                self._proc.kill()
+                await self._proc.wait()
+            except ProcessLookupError:
+                pass
+        self._proc = None
+        await self._wait_output()
+        self._exited()
+
+        self._set_state(ServerState.cleaning_up)
+        await self._clean_up()
+        self._set_state(ServerState.dead)
+
+    async def wait_exited(self) -> None:
+        """Waits until the process exits (right away if there is none)."""
+        if self._proc is not None:
+            await self._proc.wait()
+
+    def detach(self) -> None:
+        """Stops following the server, but leaves it running."""
+        if self._output is not None:
+            self._output.cancel()
+            self._output = None
+        self._proc = None
+        self._state_changed = None
+
     async def stop(self) -> None:
         """Starts the server with some config."""
         if self._state != ServerState.running:
             raise RuntimeError("Trying to stop server that's not running")
 
-        self._set_state(ServerState.stopping)
-        await self._stop()
-        self._set_state(ServerState.cleaning_up)
-        await self._clean_up()
+        with self._traced(), TRACER.span("stop"):
+            self._set_state(ServerState.stopping)
+            with TRACER.span("terminate"):
+                await self._stop()
+            self._set_state(ServerState.cleaning_up)
+            with TRACER.span("clean_up"):
+                await self._clean_up()
         self._set_state(ServerState.dead)
 
     def _set_state(self, state: "ServerState") -> None:
+        now = time.monotonic()
+        metrics.STATE_DURATION.labels(self._state.value).observe(now - self._state_since)
         self._state = state
+        self._state_since = now
         if self._state_changed is not None:
             self._state_changed(self._uuid, state)
 
+    def _traced(self) -> AbstractContextManager[None]:
+        """Puts the spans of the block in the track of this server."""
+        return TRACER.tagged(
+            str(self._uuid), server=str(self._uuid), config=self._config_name, creator=self._creator
+        )
+
+    async def _launch(self) -> None:
+        self._set_state(ServerState.setting_up)
+        with TRACER.span("set_up"):
+            await self._set_up()
+        self._set_state(ServerState.spawning)
+        try:
+            with TRACER.span("spawn"):
+                await self._spawn()
+        except Exception:
+            metrics.SPAWN_FAILURES.inc()
+            raise
+
     async def _set_up(self) -> None:
-        await self._server_description.setup.set_up_in(self._path)
+        setup = self._server_description.setup
+        if self._templates is not None:
+            await self._templates.set_up_in(setup, self._path)
+        else:
+            await setup.set_up_in(self._path)
 
     async def _spawn(self) -> None:
+        exe = self._server_description.exe
+        if self._class_data is not None:
+            self._jvm_options = self._class_data.options(exe)
+        try:
+            await self._spawn_with(with_options(exe, self._jvm_options))
+        except Exception:
+            if self._class_data is None or not self._jvm_options or self._proc is None:
+                raise
+            if self._output is None or not self._output.done():
+                # It didn't exit, so the options are not to blame.
+                raise
+            await self._proc.wait()
+            await self._wait_output()
+            self._class_data.failed(exe, self._jvm_options)
+            self._jvm_options = []
+            await self._spawn_with(exe)
+
+    async def _spawn_with(self, exe: list[str]) -> None:
         args = [
-            *self._server_description.exe,
+            *exe,
             "-dedicated",
             "-port",
             str(self._port),
@@ -137,29 +322,57 @@ class MegaMekServer:
                 ]
             )
 
-        self._proc = await asyncio.create_subprocess_exec(
-            *args,
-            cwd=self._path,
-        )
-        await wait_until_port_open(self._port, timeout=_MAX_WAIT_FOR_MM)
-        await self._schedule_check_unused()
-
-    async def _schedule_check_unused(self) -> None:
-        mod = directory_modified(os.path.join(self._path, "logs"))
-        target = mod + _AUTO_STOP_SERVER
-        if target > datetime.now(timezone.utc):
-            self._auto_stop = schedule_at(target, self._schedule_check_unused())
+        log = open(self._path / _OUTPUT_LOG, "ab") if self._output_to_file else None
+        try:
+            with TRACER.span("exec"):
+                proc = await asyncio.create_subprocess_exec(
+                    *args,
+                    cwd=self._path,
+                    stdout=log if log is not None else PIPE,
+                    stderr=STDOUT,
+                    # Signals to our process group (like Ctrl+C) don't reach it, so it
+                    # can outlive us if it's kept across restarts.
+                    start_new_session=True,
+                )
+        finally:
+            if log is not None:
+                # The process has its own copy.
+                log.close()
+        self._proc = proc
+
+        ready: Future[None] = asyncio.get_running_loop().create_future()
+
+        def on_line(line: bytes) -> None:
+            self._check_listening(ready, line)
+
+        if proc.stdout is not None:
+            self._output = asyncio.create_task(forward_lines(proc.stdout, on_line))
+        else:
+            self._output = asyncio.create_task(
+                follow_file(self._path / _OUTPUT_LOG, on_line, lambda: proc.returncode is not None)
+            )
+        self._output.add_done_callback(lambda _: _fail(ready, "MegaMek exited before listening"))
+        # The log is the fastest way to know, but poll the port in case it changes.
+        poll = asyncio.create_task(self._poll_port(ready))
+        try:
+            with TRACER.span("wait_listening"):
+                await asyncio.wait_for(ready, timeout=_MAX_WAIT_FOR_MM.total_seconds())
+        finally:
+            poll.cancel()
+
+    def _check_listening(self, ready: Future[None], line: bytes) -> None:
+        if ready.done():
             return
+        match = _LISTENING_LOG.search(line)
+        if match is not None and int(match[1]) == self._port:
+            ready.set_result(None)
 
-        self._auto_stop = None
-        if self._state == ServerState.running:
-            await self.stop()
+    async def _poll_port(self, ready: Future[None]) -> None:
+        await wait_until_port_open(self._port)
+        if not ready.done():
+            ready.set_result(None)
 
     async def _stop(self) -> None:
-        if self._auto_stop is not None:
-            self._auto_stop.cancel()
-            self._auto_stop = None
-
         if self._proc is None:
             raise Exception("Trying to close a process that does not exist (how did we get here?)")
         try:
@@ -174,15 +387,39 @@ class MegaMekServer:
         except ProcessLookupError:
             pass
         self._proc = None
+        await self._wait_output()
+        self._exited()
+
+    def _exited(self) -> None:
+        if self._class_data is not None:
+            self._class_data.exited(self._server_description.exe, self._jvm_options)
+        self._jvm_options = []
+
+    async def _wait_output(self) -> None:
+        if self._output is not None:
+            # It ends by itself once the process closes its output.
+            await asyncio.gather(self._output, return_exceptions=True)
+            self._output = None
 
     async def _clean_up(self) -> None:
-        await aioshutil.rmtree(self._path, ignore_errors=True)
+        if self._reclaimer is not None:
+            # Deleted later, so the server does not hold its slot meanwhile.
+            self._reclaimer.reclaim(self._path)
+        else:
+            await aioshutil.rmtree(self._path, ignore_errors=True)
+
+
+def _fail(future: Future, message: str) -> None:
+    if not future.done():
+        future.set_exception(RuntimeError(message))
 
 
 class ServerState(str, Enum):
     """Possible server states"""
 
     fresh = "fresh"
+    # Waiting for its turn to start (see `SpawnScheduler`).
+    queued = "queued"
     setting_up = "setting_up"
     spawning = "spawning"
     running = "running"
@@ -1,8 +1,16 @@
+import asyncio
+import os
+import re
+import shutil
 from pathlib import Path
 from typing import Annotated, Literal, Optional
 
-from aiofiles.os import makedirs, symlink
-from pydantic import BaseModel, Field, RootModel
+from pydantic import BaseModel, ByteSize, Field, RootModel
+
+# Memory used by a JVM besides its heap (metaspace, threads, code cache...).
+_JVM_OVERHEAD = 128 * 1024 * 1024
+_XMX = re.compile(r"-Xmx(\d+)([kKmMgGtT]?)")
+_JVM_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
 
 
 class ServerDescription(BaseModel):
@@ -10,25 +18,38 @@ class ServerDescription(BaseModel):
     exe: list[str]
     setup: "ServerSetup"
     game: Optional[str]
+    # Memory to reserve for each server. By default it's guessed from `-Xmx`.
+    memory: Optional[ByteSize] = None
+
+    def memory_reservation(self) -> Optional[int]:
+        """Memory a server may use in bytes, if known."""
+        if self.memory is not None:
+            return int(self.memory)
+        for arg in self.exe:
+            if match := _XMX.fullmatch(arg):
+                return int(match[1]) * _JVM_UNITS[match[2].lower()] + _JVM_OVERHEAD
+        return None
 
 
 class ServerSetup(RootModel):
     root: list["_Action"]
 
     async def set_up_in(self, path: Path) -> None:
+        # All at once so it's a single trip to a thread.
+        await asyncio.to_thread(self.apply_to, path)
+
+    def apply_to(self, path: Path) -> None:
+        """Blocking version of `set_up_in`."""
         for action in self.root:
-            await action.apply_to(path)
+            action.apply_to(path)
 
 
 class MkDir(BaseModel):
     type: Literal["mkdir"] = Field(default="mkdir")
     path: str
 
-    async def apply_to(self, path: Path) -> None:
-        try:
-            await makedirs(path / self.path, mode=511)
-        except FileExistsError:
-            pass
+    def apply_to(self, path: Path) -> None:
+        os.makedirs(path / self.path, mode=511, exist_ok=True)
 
 
 class Link(BaseModel):
@@ -36,20 +57,52 @@ class Link(BaseModel):
     source: str
     target: str
 
-    async def apply_to(self, path: Path) -> None:
-        source = Path(self.source)
-        target = Path(self.target)
+    def apply_to(self, path: Path) -> None:
+        source, target = _check_paths(self.source, self.target)
+        os.symlink(source, path / target, target_is_directory=True)
+
+
+class Copy(BaseModel):
+    """Copies a file or directory (for those that the server modifies)."""
+
+    type: Literal["copy"] = Field(default="copy")
+    source: str
+    target: str
+
+    def apply_to(self, path: Path) -> None:
+        source, target = _check_paths(self.source, self.target)
+        (path / target).parent.mkdir(parents=True, exist_ok=True)
+        if source.is_dir():
+            shutil.copytree(source, path / target, symlinks=True)
+        else:
+            shutil.copy2(source, path / target)
+
+
+class Write(BaseModel):
+    """Writes a file with the given content."""
+
+    type: Literal["write"] = Field(default="write")
+    path: str
+    content: str
+
+    def apply_to(self, path: Path) -> None:
+        if Path(self.path).is_absolute():
+            raise Exception("Path needs to be relative")
+        (path / self.path).parent.mkdir(parents=True, exist_ok=True)
+        (path / self.path).write_text(self.content)
+
 
-        if not source.is_absolute():
-            raise Exception("Sources need to be absolute")
+def _check_paths(source: str, target: str) -> tuple[Path, Path]:
+    if not Path(source).is_absolute():
+        raise Exception("Sources need to be absolute")
 
-        if target.is_absolute():
-            raise Exception("Target needs to be relative")
+    if Path(target).is_absolute():
+        raise Exception("Target needs to be relative")
 
-        await symlink(source, path / target, target_is_directory=True)
+    return Path(source), Path(target)
 
 
 _Action = Annotated[
-    MkDir | Link,
+    MkDir | Link | Copy | Write,
     Field(discriminator="type"),
 ]
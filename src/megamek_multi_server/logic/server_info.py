@@ -15,9 +15,21 @@ class ServerInfo(BaseModel):
     creator: Optional[str]
     creation_timestamp: datetime
     state: ServerState
+    last_activity: Optional[datetime] = None
+    player_count: Optional[int] = None
+    # Only set while queued.
+    queue_position: Optional[int] = None
+    # Only set for servers of agents (otherwise it's the same as the web).
+    host: Optional[str] = None
 
     @staticmethod
-    def from_server(server: MegaMekServer) -> "ServerInfo":
+    def from_server(
+        server: MegaMekServer,
+        *,
+        last_activity: Optional[datetime] = None,
+        player_count: Optional[int] = None,
+        queue_position: Optional[int] = None,
+    ) -> "ServerInfo":
         return ServerInfo(
             id=server.id,
             config_name=server.config_name,
@@ -26,4 +38,7 @@ class ServerInfo(BaseModel):
             creator=server.creator,
             creation_timestamp=server.creation_timestamp,
             state=server.state,
+            last_activity=last_activity,
+            player_count=player_count,
+            queue_position=queue_position,
         )
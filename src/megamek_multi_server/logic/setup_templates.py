@@ -0,0 +1,115 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+import shutil
+from collections.abc import Iterable
+from pathlib import Path
+
+from megamek_multi_server.utils.tasks import BackgroundTasks
+
+from .server_description import ServerSetup
+
+# `ioctl` to share the data of a file (Btrfs, XFS...).
+_FICLONE = 0x40049409
+
+
+class SetupTemplates:
+    """
+    Directories already set up once per setup, so setting up a server is only
+    copying one (in a single trip to a thread).
+    """
+
+    _path: Path
+    _templates: dict[str, asyncio.Task[Path]]
+    _tasks: BackgroundTasks
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._templates = {}
+        self._tasks = BackgroundTasks()
+
+    def update(self, setups: Iterable[ServerSetup]) -> None:
+        """Starts preparing the templates of `setups` and forgets the rest."""
+        wanted = {_key(setup): setup for setup in setups}
+        for key in self._templates.keys() - wanted.keys():
+            # Its directory is left until closing as it may be being copied.
+            del self._templates[key]
+        for key, setup in wanted.items():
+            if key not in self._templates:
+                self._prepare(key, setup)
+
+    async def set_up_in(self, setup: ServerSetup, path: Path) -> None:
+        key = _key(setup)
+        template = self._templates.get(key)
+        if template is None or (
+            template.done() and (template.cancelled() or template.exception() is not None)
+        ):
+            # Unknown or failed before. Trying again shows why it fails.
+            template = self._prepare(key, setup)
+        template_path = await asyncio.shield(template)
+        try:
+            await asyncio.to_thread(_clone_tree, template_path, path)
+        except FileNotFoundError:
+            # The template was deleted (e.g. by hand), so it's prepared again
+            # (unless another server did already).
+            current = self._templates.get(key)
+            if current is None or current is template:
+                current = self._prepare(key, setup)
+            template_path = await asyncio.shield(current)
+            await asyncio.to_thread(_reclone_tree, template_path, path)
+
+    async def close(self) -> None:
+        await self._tasks.close()
+        self._templates = {}
+        await asyncio.to_thread(shutil.rmtree, self._path, ignore_errors=True)
+
+    def _prepare(self, key: str, setup: ServerSetup) -> asyncio.Task[Path]:
+        template = self._tasks.spawn(asyncio.to_thread(_build, setup, self._path / key))
+        self._templates[key] = template
+        return template
+
+
+def _key(setup: ServerSetup) -> str:
+    return hashlib.sha256(setup.model_dump_json().encode()).hexdigest()[:16]
+
+
+def _build(setup: ServerSetup, path: Path) -> Path:
+    # Built aside and renamed so a template is never seen half done.
+    building = path.with_suffix(".building")
+    shutil.rmtree(building, ignore_errors=True)
+    building.mkdir(parents=True)
+    setup.apply_to(building)
+    shutil.rmtree(path, ignore_errors=True)
+    building.rename(path)
+    return path
+
+
+def _clone_tree(template: Path | str, path: Path | str) -> None:
+    # Lighter than `shutil.copytree` as only what setups create is expected.
+    os.makedirs(path, exist_ok=True)
+    with os.scandir(template) as entries:
+        for entry in entries:
+            target = os.path.join(path, entry.name)
+            if entry.is_symlink():
+                os.symlink(os.readlink(entry.path), target)
+            elif entry.is_dir():
+                _clone_tree(entry.path, target)
+            else:
+                _clone_file(entry.path, target)
+
+
+def _reclone_tree(template: Path, path: Path) -> None:
+    # Without what a failed clone left.
+    shutil.rmtree(path, ignore_errors=True)
+    _clone_tree(template, path)
+
+
+def _clone_file(source: str, target: str) -> None:
+    """Copies a file sharing its data if the file system allows it."""
+    try:
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    except OSError:
+        shutil.copyfile(source, target)
+    shutil.copystat(source, target)
@@ -0,0 +1,121 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+from uuid import UUID
+
+from .tracing import TRACER
+
+PositionChanged = Callable[[UUID, int], None]
+# Lower goes first (e.g. servers its creator already has).
+Rank = Callable[[UUID], float]
+
+
+class SpawnCancelled(Exception):
+    """A queued server was cancelled before it could start."""
+
+
+class SpawnScheduler:
+    """
+    Limits the servers starting at once (they compete for the CPU while the
+    JVM starts). The rest wait by rank, and then in order of arrival.
+    """
+
+    _limit: int
+    _active: int
+    # In order of arrival. The futures are resolved when it's their turn.
+    _queue: dict[UUID, asyncio.Future[None]]
+    # Last positions notified.
+    _positions: dict[UUID, int]
+    _position_changed: PositionChanged
+    _rank: Rank
+
+    def __init__(
+        self, limit: int, *, position_changed: PositionChanged, rank: Rank = lambda id: 0
+    ) -> None:
+        self._limit = limit
+        self._active = 0
+        self._queue = {}
+        self._positions = {}
+        self._position_changed = position_changed
+        self._rank = rank
+
+    def __len__(self) -> int:
+        """Servers waiting for their turn."""
+        return len(self._queue)
+
+    def position(self, id: UUID) -> Optional[int]:
+        """Position in the queue (starting at 1), if waiting."""
+        if id not in self._queue:
+            return None
+        return self._ordered().index(id) + 1
+
+    def resize(self, limit: int) -> None:
+        self._limit = limit
+        self._wake_up()
+
+    def cancel(self, id: UUID) -> bool:
+        """Takes a server out of the queue. Its start fails with `SpawnCancelled`."""
+        future = self._queue.pop(id, None)
+        if future is None:
+            return False
+        # Unless its task was cancelled already (and it's about to leave).
+        if not future.done():
+            future.set_exception(SpawnCancelled())
+        self._notify_positions()
+        return True
+
+    @asynccontextmanager
+    async def slot(self, id: UUID) -> AsyncIterator[None]:
+        """Waits for the turn of a server, and holds it until exiting."""
+        await self._acquire(id)
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._wake_up()
+
+    async def _acquire(self, id: UUID) -> None:
+        if self._active < self._limit and not self._queue:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue[id] = future
+        self._notify_positions()
+        try:
+            # Once resolved the slot is already counted as active.
+            with TRACER.span("queued"):
+                await future
+        except asyncio.CancelledError:
+            if self._queue.pop(id, None) is not None:
+                self._notify_positions()
+            elif future.done() and not future.cancelled() and future.exception() is None:
+                # It got its turn right when being cancelled.
+                self._active -= 1
+                self._wake_up()
+            raise
+
+    def _wake_up(self) -> None:
+        popped = False
+        while self._active < self._limit and self._queue:
+            future = self._queue.pop(self._ordered()[0])
+            popped = True
+            if future.done():
+                # Its task was cancelled, but it didn't leave the queue yet.
+                continue
+            self._active += 1
+            future.set_result(None)
+        if popped:
+            self._notify_positions()
+
+    def _ordered(self) -> list[UUID]:
+        # Sorting is stable, so it keeps the order of arrival for the same rank.
+        return sorted(self._queue, key=self._rank)
+
+    def _notify_positions(self) -> None:
+        positions = {id: position for position, id in enumerate(self._ordered(), 1)}
+        for id, position in positions.items():
+            if self._positions.get(id) != position:
+                self._position_changed(id, position)
+        self._positions = positions
@@ -0,0 +1,145 @@
+import asyncio
+import time
+from array import array
+from datetime import datetime, timezone
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from megamek_multi_server.utils.procfs import CLOCK_TICKS, process_tree_stats
+
+
+class StatsSample(BaseModel):
+    """Resource usage of a server at some point."""
+
+    timestamp: datetime
+    # Percentage of a single CPU (it can go over 100 using several of them).
+    cpu_percent: float
+    rss_bytes: int
+    threads: int
+    open_fds: int
+
+
+class StatsHistory:
+    """Last samples of a server, kept in fixed size arrays."""
+
+    _timestamps: array
+    _cpu_percent: array
+    _rss_bytes: array
+    _threads: array
+    _open_fds: array
+    _next: int
+    _len: int
+
+    def __init__(self, size: int) -> None:
+        self._timestamps = array("d", [0]) * size
+        self._cpu_percent = array("f", [0]) * size
+        self._rss_bytes = array("Q", [0]) * size
+        self._threads = array("I", [0]) * size
+        self._open_fds = array("I", [0]) * size
+        self._next = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, sample: StatsSample) -> None:
+        i = self._next
+        self._timestamps[i] = sample.timestamp.timestamp()
+        self._cpu_percent[i] = sample.cpu_percent
+        self._rss_bytes[i] = sample.rss_bytes
+        self._threads[i] = sample.threads
+        self._open_fds[i] = sample.open_fds
+        self._next = (i + 1) % len(self._timestamps)
+        self._len = min(self._len + 1, len(self._timestamps))
+
+    def last_rss(self) -> int | None:
+        if self._len == 0:
+            return None
+        return self._rss_bytes[self._next - 1]
+
+    def samples(self) -> list[StatsSample]:
+        """Samples from the oldest to the newest."""
+        size = len(self._timestamps)
+        start = (self._next - self._len) % size
+        return [self._sample((start + n) % size) for n in range(self._len)]
+
+    def _sample(self, i: int) -> StatsSample:
+        return StatsSample(
+            timestamp=datetime.fromtimestamp(self._timestamps[i], timezone.utc),
+            cpu_percent=round(self._cpu_percent[i], 1),
+            rss_bytes=self._rss_bytes[i],
+            threads=self._threads[i],
+            open_fds=self._open_fds[i],
+        )
+
+
+class StatsSampler:
+    """
+    Samples the resource usage of the processes of all servers at once and
+    keeps some history of it.
+    """
+
+    _history_size: int
+    _pids: dict[UUID, int]
+    # Monotonic time and CPU ticks of the previous sample.
+    _previous: dict[UUID, tuple[float, int]]
+    _history: dict[UUID, StatsHistory]
+
+    def __init__(self, history_size: int) -> None:
+        self._history_size = history_size
+        self._pids = {}
+        self._previous = {}
+        self._history = {}
+
+    def track(self, id: UUID, pid: int) -> None:
+        self._pids[id] = pid
+        self._history[id] = StatsHistory(self._history_size)
+
+    def untrack(self, id: UUID) -> None:
+        self._pids.pop(id, None)
+        self._previous.pop(id, None)
+        self._history.pop(id, None)
+
+    def last_rss(self, id: UUID) -> int | None:
+        """Last measured memory usage of a server, if any."""
+        history = self._history.get(id)
+        return history.last_rss() if history is not None else None
+
+    def history(self) -> dict[UUID, list[StatsSample]]:
+        return {id: history.samples() for id, history in self._history.items()}
+
+    async def sample(self) -> dict[UUID, StatsSample]:
+        """Samples all the tracked servers. Returns the new samples."""
+        pids = dict(self._pids)
+        if not pids:
+            return {}
+        by_pid = await asyncio.to_thread(process_tree_stats, pids.values())
+        if by_pid is None:
+            return {}
+
+        now = time.monotonic()
+        timestamp = datetime.now(timezone.utc)
+        samples = {}
+        for id, pid in pids.items():
+            stats = by_pid.get(pid)
+            if stats is None or id not in self._pids:
+                # Exited or removed while sampling.
+                continue
+            previous = self._previous.get(id)
+            self._previous[id] = (now, stats.cpu_ticks)
+            if previous is None:
+                # CPU usage needs two samples.
+                continue
+            elapsed = now - previous[0]
+            cpu_seconds = (stats.cpu_ticks - previous[1]) / CLOCK_TICKS
+            sample = StatsSample(
+                timestamp=timestamp,
+                cpu_percent=round(100 * cpu_seconds / elapsed, 1) if elapsed > 0 else 0,
+                rss_bytes=stats.rss_bytes,
+                threads=stats.threads,
+                open_fds=stats.open_fds,
+            )
+            self._history[id].append(sample)
+            samples[id] = sample
+        return samples
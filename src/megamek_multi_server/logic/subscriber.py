@@ -0,0 +1,73 @@
+import asyncio
+import itertools
+from collections import deque
+from typing import Callable
+
+from .wire import Message
+
+Snapshot = Callable[[], list[Message]]
+
+_ids = itertools.count()
+
+
+class Subscriber:
+    """
+    Pending events of a single client.
+
+    The amount of pending events is bounded. If a client falls too far behind
+    its backlog is dropped and replaced by a fresh snapshot of the state.
+    """
+
+    id: int
+    _max_pending: int
+    _snapshot: Snapshot
+    _pending: deque[Message]
+    _resync: bool
+    _closed: bool
+    _wakeup: asyncio.Event
+
+    def __init__(
+        self, max_pending: int, snapshot: Snapshot, missed: list[Message] | None = None
+    ) -> None:
+        self.id = next(_ids)
+        self._max_pending = max_pending
+        self._snapshot = snapshot
+        self._pending = deque()
+        # New subscribers start with a snapshot unless they are resuming.
+        self._resync = missed is None or len(missed) > max_pending
+        if not self._resync and missed is not None:
+            self._pending.extend(missed)
+        self._closed = False
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, message: Message) -> None:
+        if self._closed or self._resync:
+            # A resync will send the current state anyway.
+            return
+        if len(self._pending) >= self._max_pending:
+            self._pending.clear()
+            self._resync = True
+        else:
+            self._pending.append(message)
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._wakeup.set()
+
+    async def messages(self) -> list[Message] | None:
+        """Waits for the next messages. Returns `None` once closed."""
+        while True:
+            if self._closed:
+                return None
+            if self._resync:
+                self._resync = False
+                self._pending.clear()
+                return self._snapshot()
+            if self._pending:
+                return [self._pending.popleft()]
+            self._wakeup.clear()
+            await self._wakeup.wait()
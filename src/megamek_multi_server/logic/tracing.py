@@ -0,0 +1,5 @@
+"""Spans of the whole application (see `/trace`)."""
+
+from megamek_multi_server.utils.tracing import Tracer
+
+TRACER = Tracer()
@@ -0,0 +1,156 @@
+import asyncio
+from collections import deque
+from collections.abc import Iterator
+from typing import Callable
+
+from megamek_multi_server.utils.tasks import BackgroundTasks
+
+from .server import MegaMekServer, ServerState
+
+NewServer = Callable[[str], MegaMekServer]
+DiscardServer = Callable[[MegaMekServer], None]
+CanGrow = Callable[[str], bool]
+
+
+class WarmPool:
+    """
+    Keeps a number of already set-up and spawned servers for each description
+    so they can be handed out instantly.
+    """
+
+    _size: int
+    _new_server: NewServer
+    _discard: DiscardServer
+    _can_grow: CanGrow
+    _ready: dict[str, deque[MegaMekServer]]
+    _warming: dict[str, set[MegaMekServer]]
+    # Notice when a ready server dies while waiting in the pool.
+    _watchers: dict[MegaMekServer, asyncio.Task]
+    _generations: dict[str, int]
+    _tasks: BackgroundTasks
+
+    def __init__(
+        self,
+        size: int,
+        *,
+        new_server: NewServer,
+        discard: DiscardServer,
+        can_grow: CanGrow,
+    ) -> None:
+        self._size = size
+        self._new_server = new_server
+        self._discard = discard
+        self._can_grow = can_grow
+        self._ready = {}
+        self._warming = {}
+        self._watchers = {}
+        # Changes when the servers of a description become outdated.
+        self._generations = {}
+        self._tasks = BackgroundTasks()
+
+    def __len__(self) -> int:
+        """Number of servers held by the pool (ready or warming up)."""
+        return sum(len(q) for q in self._ready.values()) + sum(map(len, self._warming.values()))
+
+    def servers(self) -> Iterator[MegaMekServer]:
+        """Servers held by the pool (ready or warming up)."""
+        for ready in self._ready.values():
+            yield from ready
+        for warming in self._warming.values():
+            yield from warming
+
+    def has_ready(self, config_name: str) -> bool:
+        return len(self._ready.get(config_name, ())) > 0
+
+    def take(self, config_name: str) -> MegaMekServer | None:
+        """Takes a running server out of the pool, if there is any."""
+        ready = self._ready.get(config_name)
+        while ready:
+            server = ready.popleft()
+            self._unwatch(server)
+            if server.state == ServerState.running:
+                return server
+            # The process died while waiting in the pool.
+            self._tasks.spawn(self._dispose(server))
+            self.refill(config_name)
+        return None
+
+    def refill(self, config_name: str) -> None:
+        """Starts enough servers in the background to get the pool back to its size."""
+        ready = self._ready.setdefault(config_name, deque())
+        warming = self._warming.setdefault(config_name, set())
+        for _ in range(self._size - len(ready) - len(warming)):
+            if not self._can_grow(config_name):
+                return
+            server = self._new_server(config_name)
+            warming.add(server)
+            self._tasks.spawn(self._warm_up(server))
+
+    def resize(self, size: int) -> None:
+        """Changes the number of servers kept for each description."""
+        self._size = size
+        for config_name, ready in self._ready.items():
+            while len(ready) > size:
+                server = ready.pop()
+                self._unwatch(server)
+                self._tasks.spawn(self._dispose(server))
+
+    def invalidate(self, config_name: str) -> None:
+        """Discards the servers of a description (e.g. because it changed)."""
+        self._generations[config_name] = self._generations.get(config_name, 0) + 1
+        for server in self._ready.pop(config_name, ()):
+            self._unwatch(server)
+            self._tasks.spawn(self._dispose(server))
+
+    async def close(self) -> None:
+        """Cancels pending warm ups and stops every pooled server."""
+        await self._tasks.close()
+
+        ready = self._ready
+        self._ready = {}
+        self._watchers = {}
+        await asyncio.gather(
+            *(self._dispose(server) for q in ready.values() for server in q),
+            return_exceptions=True,
+        )
+
+    async def _warm_up(self, server: MegaMekServer) -> None:
+        config_name = server.config_name
+        generation = self._generations.get(config_name, 0)
+        try:
+            await server.start()
+        except asyncio.CancelledError:
+            await self._dispose(server)
+            raise
+        except Exception as e:
+            print(f"Could not warm up a server for {config_name}: {e!r}")
+            await self._dispose(server)
+            return
+        finally:
+            self._warming[config_name].discard(server)
+        if generation != self._generations.get(config_name, 0):
+            await self._dispose(server)
+            return
+        self._ready.setdefault(config_name, deque()).append(server)
+        self._watchers[server] = self._tasks.spawn(self._watch(server))
+
+    async def _watch(self, server: MegaMekServer) -> None:
+        await server.wait_exited()
+        self._watchers.pop(server, None)
+        ready = self._ready.get(server.config_name)
+        if ready is None or server not in ready:
+            return
+        print(f"A server of the pool for {server.config_name} died. Replacing it.")
+        ready.remove(server)
+        await self._dispose(server)
+        self.refill(server.config_name)
+
+    def _unwatch(self, server: MegaMekServer) -> None:
+        if (watcher := self._watchers.pop(server, None)) is not None:
+            watcher.cancel()
+
+    async def _dispose(self, server: MegaMekServer) -> None:
+        try:
+            await server.abort()
+        finally:
+            self._discard(server)
@@ -0,0 +1,108 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from megamek_multi_server.utils.msgpack import ExtType, packb
+
+from .events import Event, EventType
+
+
+class WireFormat(str, Enum):
+    """How events are encoded when sent to a client."""
+
+    json = "json"
+    msgpack = "msgpack"
+
+
+# Websocket subprotocols a client may ask for (in order of preference).
+SUBPROTOCOLS: dict[str, WireFormat] = {
+    "megamek.msgpack": WireFormat.msgpack,
+    "megamek.json": WireFormat.json,
+}
+
+# MessagePack sends these instead of the event type names. Only append to it:
+# `static/msgpack.mjs` has the same table.
+EVENT_TYPE_TAGS: dict[EventType, int] = {
+    EventType.config_changed: 0,
+    EventType.servers_set: 1,
+    EventType.server_added: 2,
+    EventType.server_state_changed: 3,
+    EventType.server_players_changed: 4,
+    EventType.server_removed: 5,
+    EventType.error: 6,
+    EventType.server_stats: 7,
+    EventType.bulk_progress: 8,
+    EventType.server_queue_position: 9,
+}
+
+# MessagePack extension type used for UUIDs (16 raw bytes).
+UUID_EXT = 1
+
+_DATETIME = TypeAdapter(datetime)
+
+
+def negotiate(requested: list[str]) -> tuple[str | None, WireFormat]:
+    """
+    Picks the subprotocol to accept from the ones requested by the client.
+    Clients that don't ask for any get JSON.
+    """
+    for subprotocol in requested:
+        if subprotocol in SUBPROTOCOLS:
+            return subprotocol, SUBPROTOCOLS[subprotocol]
+    return None, WireFormat.json
+
+
+class Message:
+    """
+    An event to send. It's encoded at most once per format no matter how many
+    clients receive it.
+    """
+
+    _event: Event
+    _encoded: dict[WireFormat, str | bytes]
+
+    def __init__(self, event: Event) -> None:
+        self._event = event
+        self._encoded = {}
+
+    @property
+    def event(self) -> Event:
+        return self._event
+
+    def encode(self, format: WireFormat) -> str | bytes:
+        encoded = self._encoded.get(format)
+        if encoded is None:
+            encoded = _ENCODERS[format](self._event)
+            self._encoded[format] = encoded
+        return encoded
+
+
+def _encode_json(event: Event) -> str:
+    return event.model_dump_json()
+
+
+def _encode_msgpack(event: Event) -> bytes:
+    data = event.model_dump(mode="python")
+    data["event_type"] = EVENT_TYPE_TAGS[event.event_type]
+    return packb(data, default=_msgpack_default)
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return ExtType(UUID_EXT, value.bytes)
+    if isinstance(value, datetime):
+        # The same text as in JSON, so the UI shows the same times. The
+        # timestamp extension would turn local times into UTC ones.
+        return _DATETIME.dump_python(value, mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Can't encode {type(value).__name__} as MessagePack")
+
+
+_ENCODERS: dict[WireFormat, Callable[[Event], str | bytes]] = {
+    WireFormat.json: _encode_json,
+    WireFormat.msgpack: _encode_msgpack,
+}
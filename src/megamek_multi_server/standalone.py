@@ -0,0 +1,51 @@
+"""Helpers to run a conductor outside of the web (as an agent or a daemon)."""
+
+import asyncio
+import os
+import signal
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import asynccontextmanager
+from typing import Any
+
+from megamek_multi_server.utils.watched_file import WatchedFile
+
+from .logic.conductor import Conductor
+from .logic.config import Config, load_config
+from .logic.registry import server_storage
+
+_CONFIG_ENV = "QUART_MEGAMEK_MULTI_SERVER"
+
+
+@asynccontextmanager
+async def standalone_conductor() -> AsyncIterator[tuple[Conductor, WatchedFile[Config]]]:
+    """A running conductor configured (and reconfigured) by the usual config file."""
+    config_file = WatchedFile(os.environ[_CONFIG_ENV], load_config)
+    async with server_storage(config_file.value) as (servers_path, registry):
+        conductor = Conductor.from_config(servers_path, config_file.value, registry=registry)
+        await conductor.restore()
+        config_file.subscribe(conductor.reconfigure)
+        config_file.start()
+        conductor.start()
+        try:
+            yield conductor, config_file
+        finally:
+            await conductor.shutdown()
+            await config_file.close()
+
+
+def run_until_terminated(main: Coroutine[Any, Any, None]) -> None:
+    """Runs `main` until it ends, or cancels it on SIGTERM or Ctrl+C."""
+
+    async def run() -> None:
+        task = asyncio.create_task(main)
+        # Cancelling lets the servers be stopped before exiting.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
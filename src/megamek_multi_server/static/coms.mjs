@@ -1,16 +1,55 @@
+import { decodeEvent } from './msgpack.mjs'
 import { noop } from './utils.mjs'
 
+const INITIAL_RECONNECT_DELAY_MS = 500
+const MAX_RECONNECT_DELAY_MS = 30000
+// Preferred first. Servers that don't know them just send JSON.
+const SUBPROTOCOLS = ['megamek.msgpack', 'megamek.json']
+
 export class ServerComs {
-    constructor() {
-        const protocol = wsProtocol()
-        this.ws = new WebSocket(`${protocol}//${location.host}/ws`)
+    constructor({ stats = false } = {}) {
+        this.stats = stats
         this.listeners = []
+        this.lastSeq = null
+        // Sequence numbers are only valid in the journal they come from.
+        this.journal = null
+        this.reconnectDelay = INITIAL_RECONNECT_DELAY_MS
+        this.connect()
+    }
+
+    connect() {
+        // When reconnecting only the missed events are sent (if still available)
+        const protocol = wsProtocol()
+        const params = new URLSearchParams()
+        if (this.lastSeq !== null) {
+            params.set('since', this.lastSeq)
+            params.set('journal', this.journal)
+        }
+        if (this.stats) {
+            params.set('stats', '')
+        }
+        const query = params.size > 0 ? `?${params}` : ''
+        this.ws = new WebSocket(`${protocol}//${location.host}/ws${query}`, SUBPROTOCOLS)
+        this.ws.binaryType = 'arraybuffer'
+        this.ws.addEventListener('open', () => {
+            this.reconnectDelay = INITIAL_RECONNECT_DELAY_MS
+        })
         this.ws.addEventListener('message', e => {
-            const event = JSON.parse(e.data)
+            const event = typeof e.data === 'string' ? JSON.parse(e.data) : decodeEvent(e.data)
+            if (typeof event.seq === 'number') {
+                this.lastSeq = event.seq
+            }
+            if (typeof event.journal === 'string') {
+                this.journal = event.journal
+            }
             for (const l of this.listeners) {
                 l(event)
             }
         });
+        this.ws.addEventListener('close', () => {
+            setTimeout(() => this.connect(), this.reconnectDelay)
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, MAX_RECONNECT_DELAY_MS)
+        })
     }
 
     addEventListener(listener) {
@@ -21,7 +60,11 @@ export class ServerComs {
             const serversSet = asListener(listener, 'serversSet');
             const serverAdded = asListener(listener, 'serverAdded');
             const serverStateChanged = asListener(listener, 'serverStateChanged');
+            const serverPlayersChanged = asListener(listener, 'serverPlayersChanged');
+            const serverQueuePosition = asListener(listener, 'serverQueuePosition');
             const serverRemoved = asListener(listener, 'serverRemoved');
+            const serverStats = asListener(listener, 'serverStats');
+            const bulkProgress = asListener(listener, 'bulkProgress');
             const error = asListener(listener, 'error');
             this.addEventListener((event) => {
                 console.debug(event)
@@ -33,8 +76,16 @@ export class ServerComs {
                     serverAdded(event.info)
                 } else if (event.event_type === 'server_state_changed') {
                     serverStateChanged(event.id, event.new_state)
+                } else if (event.event_type === 'server_players_changed') {
+                    serverPlayersChanged(event.id, event.player_count)
+                } else if (event.event_type === 'server_queue_position') {
+                    serverQueuePosition(event.id, event.position)
                 } else if (event.event_type === 'server_removed') {
                     serverRemoved(event.id)
+                } else if (event.event_type === 'server_stats') {
+                    serverStats(event.id, event.samples)
+                } else if (event.event_type === 'bulk_progress') {
+                    bulkProgress(event)
                 } else if (event.event_type === 'error') {
                     error(event.id)
                 } else {
@@ -55,6 +106,29 @@ export class ServerComs {
         this.ws.send(event)
     }
 
+    createMany(server, count, bulk_id = null) {
+        console.debug("Creating servers", server, count)
+        const message = {
+            cmd_type: 'create_servers',
+            server,
+            count,
+            bulk_id,
+        }
+        this.ws.send(JSON.stringify(message))
+    }
+
+    // Filter fields: creator, config_name, state, idle_for (ISO 8601 duration
+    // since the server's last activity, the same as `last_activity`)
+    destroyWhere(filter = {}, bulk_id = null) {
+        console.debug("Destroying servers", filter)
+        const message = {
+            cmd_type: 'destroy_servers',
+            filter,
+            bulk_id,
+        }
+        this.ws.send(JSON.stringify(message))
+    }
+
     destroy(id) {
         console.debug("Destroying server", id)
         const message = {
@@ -0,0 +1,136 @@
+// Minimal MessagePack decoder for the events sent by the server
+// (see `logic/wire.py`).
+
+// Same order as `EVENT_TYPE_TAGS`. Only append to it.
+const EVENT_TYPES = [
+    'config_changed',
+    'servers_set',
+    'server_added',
+    'server_state_changed',
+    'server_players_changed',
+    'server_removed',
+    'error',
+    'server_stats',
+    'bulk_progress',
+    'server_queue_position',
+]
+
+const UUID_EXT = 1
+
+export function decodeEvent(buffer) {
+    const event = decode(buffer)
+    if (typeof event.event_type === 'number') {
+        event.event_type = EVENT_TYPES[event.event_type] ?? event.event_type
+    }
+    return event
+}
+
+export function decode(buffer) {
+    const reader = new Reader(new Uint8Array(buffer))
+    return reader.value()
+}
+
+class Reader {
+    constructor(bytes) {
+        this.bytes = bytes
+        this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength)
+        this.pos = 0
+        this.text = new TextDecoder()
+    }
+
+    value() {
+        const b = this.u8()
+        if (b <= 0x7f) return b
+        if (b <= 0x8f) return this.map(b & 0x0f)
+        if (b <= 0x9f) return this.array(b & 0x0f)
+        if (b <= 0xbf) return this.str(b & 0x1f)
+        if (b >= 0xe0) return b - 0x100
+        switch (b) {
+            case 0xc0: return null
+            case 0xc2: return false
+            case 0xc3: return true
+            case 0xc4: return this.bin(this.u8())
+            case 0xc5: return this.bin(this.u16())
+            case 0xc6: return this.bin(this.u32())
+            case 0xc7: return this.ext(this.u8())
+            case 0xc8: return this.ext(this.u16())
+            case 0xc9: return this.ext(this.u32())
+            case 0xca: return this.read(4, (v, p) => v.getFloat32(p))
+            case 0xcb: return this.read(8, (v, p) => v.getFloat64(p))
+            case 0xcc: return this.u8()
+            case 0xcd: return this.u16()
+            case 0xce: return this.u32()
+            case 0xcf: return this.read(8, (v, p) => Number(v.getBigUint64(p)))
+            case 0xd0: return this.read(1, (v, p) => v.getInt8(p))
+            case 0xd1: return this.read(2, (v, p) => v.getInt16(p))
+            case 0xd2: return this.read(4, (v, p) => v.getInt32(p))
+            case 0xd3: return this.read(8, (v, p) => Number(v.getBigInt64(p)))
+            case 0xd4: return this.ext(1)
+            case 0xd5: return this.ext(2)
+            case 0xd6: return this.ext(4)
+            case 0xd7: return this.ext(8)
+            case 0xd8: return this.ext(16)
+            case 0xd9: return this.str(this.u8())
+            case 0xda: return this.str(this.u16())
+            case 0xdb: return this.str(this.u32())
+            case 0xdc: return this.array(this.u16())
+            case 0xdd: return this.array(this.u32())
+            case 0xde: return this.map(this.u16())
+            case 0xdf: return this.map(this.u32())
+        }
+        throw new Error(`Invalid MessagePack byte 0x${b.toString(16)}`)
+    }
+
+    read(size, get) {
+        const v = get(this.view, this.pos)
+        this.pos += size
+        return v
+    }
+    u8() { return this.read(1, (v, p) => v.getUint8(p)) }
+    u16() { return this.read(2, (v, p) => v.getUint16(p)) }
+    u32() { return this.read(4, (v, p) => v.getUint32(p)) }
+
+    bin(length) {
+        const data = this.bytes.subarray(this.pos, this.pos + length)
+        this.pos += length
+        return data
+    }
+    str(length) {
+        return this.text.decode(this.bin(length))
+    }
+    array(length) {
+        const result = new Array(length)
+        for (let i = 0; i < length; ++i) {
+            result[i] = this.value()
+        }
+        return result
+    }
+    map(length) {
+        const result = {}
+        for (let i = 0; i < length; ++i) {
+            const key = this.value()
+            result[key] = this.value()
+        }
+        return result
+    }
+
+    ext(length) {
+        const type = this.read(1, (v, p) => v.getInt8(p))
+        const data = this.bin(length)
+        if (type === UUID_EXT) {
+            return uuid(data)
+        }
+        return { type, data }
+    }
+}
+
+function uuid(data) {
+    const hex = Array.from(data, b => b.toString(16).padStart(2, '0')).join('')
+    return [
+        hex.slice(0, 8),
+        hex.slice(8, 12),
+        hex.slice(12, 16),
+        hex.slice(16, 20),
+        hex.slice(20),
+    ].join('-')
+}
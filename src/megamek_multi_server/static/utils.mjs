@@ -13,20 +13,35 @@ export function afterLoad(f) {
     }
 }
 
-export function stateEl(state) {
+export function setCreateButtons(container, servers, create) {
+    if (!container) {
+        return
+    }
+    container.replaceChildren(...servers.map(name => {
+        const btn = document.createElement('button')
+        btn.setAttribute('data-create', name)
+        btn.append(`Crea servidor: ${name}`)
+        btn.addEventListener('click', () => create(name))
+        return btn
+    }))
+}
+
+export function stateEl(state, queuePosition = null) {
     const el = document.createElement('span')
     el.classList.add('state')
-    updateStateEl(el, state)
+    updateStateEl(el, state, queuePosition)
     return el
 }
-export function updateStateEl(el, state) {
+export function updateStateEl(el, state, queuePosition = null) {
     el.textContent = stateEmoji(state)
-    el.setAttribute('data-tooltip', stateTooltip(state))
+    const tooltip = stateTooltip(state)
+    el.setAttribute('data-tooltip', queuePosition === null ? tooltip : `${tooltip} (${queuePosition})`)
 }
 
 function stateEmoji(state) {
     const EMOJIS = {
         fresh: "📡",
+        queued: "🕒",
         setting_up: "⏳",
         spawning: "⏳",
         running: "👍",
@@ -45,6 +60,7 @@ function stateEmoji(state) {
 function stateTooltip(state) {
     const TOOLTIPS = {
         fresh: "Reservat",
+        queued: "A la cua",
         setting_up: "Preparant",
         spawning: "Aixecant",
         running: "Funcionant",
@@ -0,0 +1,98 @@
+import asyncio
+import ctypes
+import os
+import struct
+from typing import Callable
+
+# Constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+OnEvent = Callable[[int, int, bytes], None]
+
+
+class Inotify:
+    """
+    Minimal inotify binding (Linux only) integrated in the running event loop.
+
+    `on_event` is called with the watch descriptor, the event mask and the
+    name of the file (empty if the event is about the watched path itself).
+    Raises `OSError` if inotify is not available.
+    """
+
+    _fd: int
+    _on_event: OnEvent
+    _loop: asyncio.AbstractEventLoop
+
+    def __init__(self, on_event: OnEvent) -> None:
+        libc = _libc()
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            _raise_errno()
+        self._fd = fd
+        self._on_event = on_event
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(fd, self._read)
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = _libc().inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            _raise_errno(path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # It fails if the watch is already gone (e.g. the path was deleted).
+        _libc().inotify_rm_watch(self._fd, wd)
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        self._loop.remove_reader(self._fd)
+        os.close(self._fd)
+        self._fd = -1
+
+    def _read(self) -> None:
+        try:
+            data = os.read(self._fd, _READ_SIZE)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            self._on_event(wd, mask, name)
+
+
+_LIBC: ctypes.CDLL | None = None
+
+
+def _libc() -> ctypes.CDLL:
+    global _LIBC
+    if _LIBC is None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _LIBC = libc
+    return _LIBC
+
+
+def _raise_errno(path: str | None = None) -> None:
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err), path)
@@ -0,0 +1,169 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Recording a value only updates numbers that already exist, so it's cheap
+enough to be done anywhere. All the work is done when rendering.
+"""
+
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from typing import Generic, TypeVar
+
+# (suffix, labels, value)
+Sample = tuple[str, tuple[tuple[str, str], ...], float]
+
+
+class Metric(ABC):
+    name: str
+    help: str
+    type: str
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]: ...
+
+
+class Counter(Metric):
+    type = "counter"
+    _value: float
+
+    def __init__(self, name: str, help: str) -> None:
+        super().__init__(name, help)
+        self._value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def samples(self) -> Iterator[Sample]:
+        yield "", (), self._value
+
+
+class Gauge(Metric):
+    type = "gauge"
+    _value: float
+
+    def __init__(self, name: str, help: str) -> None:
+        super().__init__(name, help)
+        self._value = 0
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._value -= amount
+
+    def samples(self) -> Iterator[Sample]:
+        yield "", (), self._value
+
+
+class Histogram(Metric):
+    type = "histogram"
+    _bounds: tuple[float, ...]
+    # One per bound plus the last one (`+Inf`). Not cumulative.
+    _counts: list[int]
+    _sum: float
+
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...]) -> None:
+        super().__init__(name, help)
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._sum += value
+
+    def samples(self) -> Iterator[Sample]:
+        cumulative = 0
+        for bound, count in zip(self._bounds, self._counts):
+            cumulative += count
+            yield "_bucket", (("le", _format(bound)),), cumulative
+        cumulative += self._counts[-1]
+        yield "_bucket", (("le", "+Inf"),), cumulative
+        yield "_sum", (), self._sum
+        yield "_count", (), cumulative
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Labeled(Metric, Generic[M]):
+    """The same metric split by the value of a label."""
+
+    _label: str
+    _new: Callable[[], M]
+    _children: dict[str, M]
+
+    def __init__(self, label: str, new: Callable[[], M]) -> None:
+        prototype = new()
+        super().__init__(prototype.name, prototype.help)
+        self.type = prototype.type
+        self._label = label
+        self._new = new
+        self._children = {}
+
+    def labels(self, value: str) -> M:
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = self._new()
+        return child
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def samples(self) -> Iterator[Sample]:
+        for value, child in self._children.items():
+            for suffix, labels, sample in child.samples():
+                yield suffix, ((self._label, value), *labels), sample
+
+
+class Registry:
+    _metrics: dict[str, Metric]
+
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_labels(labels)} {_format(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,122 @@
+"""
+Minimal MessagePack encoder (https://msgpack.org/), enough for the events
+sent to the clients.
+"""
+
+import struct
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+
+class ExtType(NamedTuple):
+    code: int
+    data: bytes
+
+
+Default = Callable[[Any], Any]
+
+
+def packb(obj: Any, *, default: Default | None = None) -> bytes:
+    """
+    Encodes `obj`. Values of unsupported types are first converted with
+    `default` (which can return an `ExtType`).
+    """
+    out = bytearray()
+    _pack(obj, out, default)
+    return bytes(out)
+
+
+def _pack(obj: Any, out: bytearray, default: Default | None) -> None:
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif type(obj) is int:
+        _pack_int(obj, out)
+    elif type(obj) is float:
+        out += struct.pack(">Bd", 0xCB, obj)
+    elif type(obj) is str:
+        data = obj.encode("utf-8")
+        _pack_header(len(data), out, fix=0xA0, fix_max=31, codes=(0xD9, 0xDA, 0xDB))
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        _pack_header(len(obj), out, fix=None, fix_max=-1, codes=(0xC4, 0xC5, 0xC6))
+        out += obj
+    elif isinstance(obj, ExtType):
+        # Before tuples, as it's one.
+        _pack_ext(obj, out)
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(len(obj), out, fix=0x90, fix_max=15, codes=(None, 0xDC, 0xDD))
+        for item in obj:
+            _pack(item, out, default)
+    elif isinstance(obj, dict):
+        _pack_header(len(obj), out, fix=0x80, fix_max=15, codes=(None, 0xDE, 0xDF))
+        for key, value in obj.items():
+            _pack(key, out, default)
+            _pack(value, out, default)
+    elif default is not None:
+        _pack(default(obj), out, None)
+    else:
+        raise TypeError(f"Can't encode {type(obj).__name__} as MessagePack")
+
+
+def _pack_int(n: int, out: bytearray) -> None:
+    if 0 <= n <= 0x7F:
+        out.append(n)
+    elif -32 <= n < 0:
+        out.append(n & 0xFF)
+    elif 0 <= n <= 0xFF:
+        out += struct.pack(">BB", 0xCC, n)
+    elif 0 <= n <= 0xFFFF:
+        out += struct.pack(">BH", 0xCD, n)
+    elif 0 <= n <= 0xFFFF_FFFF:
+        out += struct.pack(">BI", 0xCE, n)
+    elif 0 <= n <= 0xFFFF_FFFF_FFFF_FFFF:
+        out += struct.pack(">BQ", 0xCF, n)
+    elif -(2**7) <= n:
+        out += struct.pack(">Bb", 0xD0, n)
+    elif -(2**15) <= n:
+        out += struct.pack(">Bh", 0xD1, n)
+    elif -(2**31) <= n:
+        out += struct.pack(">Bi", 0xD2, n)
+    elif -(2**63) <= n:
+        out += struct.pack(">Bq", 0xD3, n)
+    else:
+        raise OverflowError("Integer too big for MessagePack")
+
+
+def _pack_header(
+    length: int,
+    out: bytearray,
+    *,
+    fix: int | None,
+    fix_max: int,
+    codes: tuple[int | None, int, int],
+) -> None:
+    code8, code16, code32 = codes
+    if fix is not None and length <= fix_max:
+        out.append(fix | length)
+    elif code8 is not None and length <= 0xFF:
+        out += struct.pack(">BB", code8, length)
+    elif length <= 0xFFFF:
+        out += struct.pack(">BH", code16, length)
+    else:
+        out += struct.pack(">BI", code32, length)
+
+
+_FIXEXT = {1: 0xD4, 2: 0xD5, 4: 0xD6, 8: 0xD7, 16: 0xD8}
+
+
+def _pack_ext(ext: ExtType, out: bytearray) -> None:
+    length = len(ext.data)
+    if length in _FIXEXT:
+        out += struct.pack(">Bb", _FIXEXT[length], ext.code)
+    elif length <= 0xFF:
+        out += struct.pack(">BBb", 0xC7, length, ext.code)
+    elif length <= 0xFFFF:
+        out += struct.pack(">BHb", 0xC8, length, ext.code)
+    else:
+        out += struct.pack(">BIb", 0xC9, length, ext.code)
+    out += ext.data
@@ -1,29 +1,21 @@
-from collections.abc import Iterable
+import asyncio
 from datetime import timedelta
 
-import psutil
-
 from megamek_multi_server.utils.retry import retry
 
 
-def next_port(ports: Iterable[int], used: set[int]) -> int:
-    conns = psutil.net_connections(kind="inet")
-    used = set(used)
-    for c in conns:
-        if c.laddr:
-            used.add(c.laddr.port)
+async def is_port_open(port: int) -> bool:
+    """Checks if something is listening on a local port by connecting to it."""
     try:
-        return next(p for p in ports if p not in used)
-    except StopIteration:
-        raise Exception("No available ports")
-
-
-def is_port_open(port: int) -> bool:
-    return any(_is_port_open(c, port) for c in psutil.net_connections(kind="inet"))
-
-
-def _is_port_open(c, port: int) -> bool:
-    return c.laddr and c.laddr.port == port and c.status == psutil.CONN_LISTEN
+        _, writer = await asyncio.open_connection("localhost", port)
+    except OSError:
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
 
 
 async def wait_until_port_open(port: int, *, timeout: timedelta | None = None):
@@ -36,7 +28,38 @@ async def wait_until_port_open(port: int, *, timeout: timedelta | None = None):
 
 
 async def _port_check(port: int) -> None | tuple:
-    if is_port_open(port):
+    if await is_port_open(port):
         return ()
     else:
         return None
+
+
+_PROC_NET_TCP = ("/proc/net/tcp", "/proc/net/tcp6")
+_TCP_ESTABLISHED = "01"
+
+
+def established_connections(ports: set[int]) -> dict[int, int] | None:
+    """
+    Counts the established TCP connections for each of the local ports by
+    reading `/proc/net/tcp{,6}` once. Returns `None` if it is not available.
+
+    This reads files, so it's better to call it outside the event loop.
+    """
+    counts = dict.fromkeys(ports, 0)
+    found = False
+    for path in _PROC_NET_TCP:
+        try:
+            with open(path, "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        found = True
+        for line in lines[1:]:
+            # sl local_address rem_address st ...
+            fields = line.split(None, 4)
+            if len(fields) < 4 or fields[3] != _TCP_ESTABLISHED:
+                continue
+            port = int(fields[1].rsplit(":", 1)[1], 16)
+            if port in counts:
+                counts[port] += 1
+    return counts if found else None
@@ -0,0 +1,77 @@
+import errno
+import socket
+import time
+from collections import deque
+from datetime import timedelta
+
+
+class PortAllocator:
+    """
+    Hands out ports from a range without scanning the whole system.
+
+    Released ports are quarantined for a while before being reused so that
+    sockets of a process that just died (e.g. in `TIME_WAIT`) don't get in the
+    way. Ports used by someone else are detected by trying to bind them.
+    """
+
+    _free: deque[int]
+    _in_use: set[int]
+    _quarantine: deque[tuple[float, int]]
+    _quarantine_time: float
+
+    def __init__(self, ports: range, *, quarantine: timedelta = timedelta(seconds=60)) -> None:
+        self._free = deque(ports)
+        self._in_use = set()
+        self._quarantine = deque()
+        self._quarantine_time = quarantine.total_seconds()
+
+    def __len__(self) -> int:
+        """Number of ports in use."""
+        return len(self._in_use)
+
+    def __contains__(self, port: object) -> bool:
+        return port in self._in_use
+
+    def reserve(self, port: int) -> None:
+        """Marks a port as in use (e.g. by a server that was already running)."""
+        self._in_use.add(port)
+
+    def acquire(self) -> int:
+        self._end_quarantine()
+        for _ in range(len(self._free)):
+            port = self._free.popleft()
+            if port in self._in_use:
+                # Reserved. It comes back once released.
+                continue
+            if is_port_free(port):
+                self._in_use.add(port)
+                return port
+            # Used by someone else. Try it again later.
+            self._free.append(port)
+        raise Exception("No available ports")
+
+    def release(self, port: int) -> None:
+        if port not in self._in_use:
+            return
+        self._in_use.remove(port)
+        self._quarantine.append((time.monotonic() + self._quarantine_time, port))
+
+    def _end_quarantine(self) -> None:
+        now = time.monotonic()
+        while self._quarantine and self._quarantine[0][0] <= now:
+            _, port = self._quarantine.popleft()
+            self._free.append(port)
+
+
+def is_port_free(port: int) -> bool:
+    """Checks if a TCP port can be listened on by trying to bind it."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Same as the JVM does by default, so `TIME_WAIT` does not count as used.
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("", port))
+        except OSError as e:
+            if e.errno in (errno.EADDRINUSE, errno.EACCES):
+                return False
+            raise
+    return True
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import signal
+import sys
+from asyncio import StreamReader
+from pathlib import Path
+from typing import Callable, Optional
+
+_CHUNK_SIZE = 64 * 1024
+# Waits between reads of a followed file without new data. It grows while
+# there is none, so idle processes cost little.
+_FOLLOW_MIN_INTERVAL = 0.05
+_FOLLOW_MAX_INTERVAL = 1.0
+
+
+async def forward_lines(stream: StreamReader, on_line: Callable[[bytes], None]) -> None:
+    """
+    Copies a stream (like the output of a child process) into our stdout until
+    it ends, calling `on_line` for every complete line.
+    """
+    lines = _Lines(on_line)
+    while chunk := await stream.read(_CHUNK_SIZE):
+        lines.feed(chunk)
+    lines.end()
+
+
+async def follow_file(
+    path: Path,
+    on_line: Callable[[bytes], None],
+    is_done: Callable[[], bool],
+    *,
+    from_end: bool = False,
+) -> None:
+    """
+    Like `forward_lines`, for a file being written (e.g. the output of a
+    process that may outlive us). It ends once `is_done()` and the rest of the
+    file has been read.
+    """
+    lines = _Lines(on_line)
+    interval = _FOLLOW_MIN_INTERVAL
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return
+    with f:
+        if from_end:
+            f.seek(0, os.SEEK_END)
+        while True:
+            if chunk := f.read(_CHUNK_SIZE):
+                lines.feed(chunk)
+                interval = _FOLLOW_MIN_INTERVAL
+                continue
+            if is_done():
+                # It may have written more right before ending.
+                while chunk := f.read(_CHUNK_SIZE):
+                    lines.feed(chunk)
+                break
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, _FOLLOW_MAX_INTERVAL)
+    lines.end()
+
+
+class _Lines:
+    """Copies chunks of output into our stdout, splitting them in lines."""
+
+    _on_line: Callable[[bytes], None]
+    _pending: bytes
+
+    def __init__(self, on_line: Callable[[bytes], None]) -> None:
+        self._on_line = on_line
+        self._pending = b""
+
+    def feed(self, chunk: bytes) -> None:
+        out = sys.stdout.buffer
+        out.write(chunk)
+        out.flush()
+
+        *lines, self._pending = (self._pending + chunk).split(b"\n")
+        for line in lines:
+            self._on_line(line)
+        if len(self._pending) > _CHUNK_SIZE:
+            # Really long line. Not worth looking at it.
+            self._pending = b""
+
+    def end(self) -> None:
+        if self._pending:
+            self._on_line(self._pending)
+
+
+# For kernels without `pidfd_open`.
+_EXIT_POLL_INTERVAL = 0.5
+
+
+class AdoptedProcess:
+    """
+    A process that is not a child of ours (e.g. started before restarting),
+    with the parts of `asyncio.subprocess.Process` used to stop it. Its exit
+    code can't be known, so it's `-1` once it exits.
+    """
+
+    pid: int
+    _returncode: Optional[int]
+
+    def __init__(self, pid: int) -> None:
+        self.pid = pid
+        self._returncode = None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        if self._returncode is None and not _is_alive(self.pid):
+            self._returncode = -1
+        return self._returncode
+
+    def terminate(self) -> None:
+        os.kill(self.pid, signal.SIGTERM)
+
+    def kill(self) -> None:
+        os.kill(self.pid, signal.SIGKILL)
+
+    async def wait(self) -> int:
+        try:
+            fd = os.pidfd_open(self.pid)
+        except ProcessLookupError:
+            self._returncode = -1
+            return -1
+        except (AttributeError, OSError):
+            # No pidfds (old kernel or not Linux).
+            while self.returncode is None:
+                await asyncio.sleep(_EXIT_POLL_INTERVAL)
+            return -1
+
+        loop = asyncio.get_running_loop()
+        exited = loop.create_future()
+
+        def readable() -> None:
+            if not exited.done():
+                exited.set_result(None)
+
+        loop.add_reader(fd, readable)
+        try:
+            await exited
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+        self._returncode = -1
+        return -1
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,120 @@
+"""Process statistics read directly from `/proc` (Linux only)."""
+
+import os
+from collections.abc import Iterable
+from typing import NamedTuple
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+class ProcessStats(NamedTuple):
+    """Usage of a process tree (a process and all its descendants)."""
+
+    # User plus system time in clock ticks (see `CLOCK_TICKS`).
+    cpu_ticks: int
+    rss_bytes: int
+    threads: int
+    open_fds: int
+
+
+class _Stat(NamedTuple):
+    ppid: int
+    cpu_ticks: int
+    rss_bytes: int
+    threads: int
+
+
+def process_tree_stats(pids: Iterable[int]) -> dict[int, ProcessStats] | None:
+    """
+    Stats of the trees rooted at each of `pids` with a single pass over
+    `/proc`. Processes that no longer exist are left out. Returns `None` if
+    `/proc` is not available.
+
+    Children are included as the configured executable may be a script that
+    starts the actual JVM.
+    """
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return None
+
+    stats: dict[int, _Stat] = {}
+    children: dict[int, list[int]] = {}
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        stat = _read_stat(pid)
+        if stat is None:
+            continue
+        stats[pid] = stat
+        children.setdefault(stat.ppid, []).append(pid)
+
+    result = {}
+    for root in pids:
+        if root not in stats:
+            continue
+        cpu_ticks = rss_bytes = threads = open_fds = 0
+        pending = [root]
+        while pending:
+            pid = pending.pop()
+            stat = stats[pid]
+            cpu_ticks += stat.cpu_ticks
+            rss_bytes += stat.rss_bytes
+            threads += stat.threads
+            open_fds += _count_fds(pid)
+            pending.extend(children.get(pid, ()))
+        result[root] = ProcessStats(cpu_ticks, rss_bytes, threads, open_fds)
+    return result
+
+
+def _read_stat(pid: int) -> _Stat | None:
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The name (2nd field) is between parenthesis and may contain spaces.
+    fields = data[data.rfind(b")") + 2 :].split()
+    # Fields are numbered from the state (3rd field in `man proc`).
+    return _Stat(
+        ppid=int(fields[1]),
+        cpu_ticks=int(fields[11]) + int(fields[12]),
+        rss_bytes=int(fields[21]) * _PAGE_SIZE,
+        threads=int(fields[17]),
+    )
+
+
+def _count_fds(pid: int) -> int:
+    try:
+        return len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return 0
+
+
+def start_time(pid: int) -> int | None:
+    """When a process started (in clock ticks after boot), to tell apart reused pids."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = data[data.rfind(b")") + 2 :].split()
+    return int(fields[19])
+
+
+def processes_in(path: str) -> dict[int, str]:
+    """Processes whose working directory is `path` or inside it (and which one)."""
+    prefix = path.rstrip("/") + "/"
+    result = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            cwd = os.readlink(f"/proc/{entry}/cwd")
+        except OSError:
+            continue
+        if cwd == path or cwd.startswith(prefix):
+            result[int(entry)] = cwd
+    return result
@@ -0,0 +1,48 @@
+import time
+from collections import deque
+from datetime import timedelta
+
+# Once this many keys are tracked, the expired ones are dropped.
+_PRUNE_THRESHOLD = 4096
+
+
+class RateLimiter:
+    """Counts hits per key in a sliding time window."""
+
+    _limit: int
+    _window: float
+    _hits: dict[str, deque[float]]
+
+    def __init__(self, limit: int, window: timedelta) -> None:
+        self._limit = limit
+        self._window = window.total_seconds()
+        self._hits = {}
+
+    def exceeded(self, key: str) -> bool:
+        hits = self._hits.get(key)
+        if hits is None:
+            return False
+        self._expire(hits, time.monotonic())
+        return len(hits) >= self._limit
+
+    def hit(self, key: str) -> None:
+        now = time.monotonic()
+        if len(self._hits) >= _PRUNE_THRESHOLD:
+            self._prune(now)
+        hits = self._hits.setdefault(key, deque())
+        self._expire(hits, now)
+        hits.append(now)
+
+    def reset(self, key: str) -> None:
+        self._hits.pop(key, None)
+
+    def _expire(self, hits: deque[float], now: float) -> None:
+        while hits and hits[0] <= now - self._window:
+            hits.popleft()
+
+    def _prune(self, now: float) -> None:
+        for key in list(self._hits):
+            hits = self._hits[key]
+            self._expire(hits, now)
+            if not hits:
+                del self._hits[key]
@@ -0,0 +1,62 @@
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Iterable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class BackgroundTasks:
+    """Keeps track of fire-and-forget tasks so they can be cancelled together."""
+
+    _tasks: set[asyncio.Task]
+
+    def __init__(self) -> None:
+        self._tasks = set()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        return task
+
+    async def close(self) -> None:
+        """Cancels every pending task and waits for them."""
+        tasks = self._tasks
+        self._tasks = set()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and (e := task.exception()) is not None:
+            print(f"Background task failed: {e!r}")
+
+
+async def bounded_map(
+    function: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int
+) -> AsyncIterator[tuple[T, R | Exception]]:
+    """
+    Calls `function` for every item with at most `limit` calls running at once.
+    Yields the results (or exceptions) as they finish.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def call(item: T) -> tuple[T, R | Exception]:
+        async with semaphore:
+            try:
+                return item, await function(item)
+            except Exception as e:
+                return item, e
+
+    tasks = [asyncio.ensure_future(call(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,125 @@
+"""
+Spans of what the application does, exported in the Chrome trace event format
+(which `chrome://tracing` and Perfetto open).
+
+Off until a buffer size is given. Meanwhile a span is a shared no-op context
+manager, so instrumented code costs a function call.
+"""
+
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, NamedTuple, Optional
+
+_NOOP: AbstractContextManager[None] = nullcontext()
+_DEFAULT_TRACK = "main"
+
+# Where spans started in this context go (e.g. a server), and its tags.
+_track: ContextVar[str] = ContextVar("track", default=_DEFAULT_TRACK)
+_tags: ContextVar[dict[str, Any]] = ContextVar("tags", default={})
+
+
+class _Span(NamedTuple):
+    name: str
+    track: str
+    # Both in microseconds.
+    start: int
+    duration: int
+    args: dict[str, Any]
+
+
+class Tracer:
+    # The latest spans, if tracing.
+    _spans: Optional[deque[_Span]]
+
+    def __init__(self) -> None:
+        self._spans = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._spans is not None
+
+    def configure(self, buffer_size: Optional[int]) -> None:
+        """Keeps the last `buffer_size` spans, or stops tracing if `None`."""
+        if buffer_size is None:
+            self._spans = None
+        elif self._spans is None or self._spans.maxlen != buffer_size:
+            self._spans = deque(self._spans or (), maxlen=buffer_size)
+
+    def span(self, name: str, **args: Any) -> AbstractContextManager[None]:
+        """Records how long the block takes (with the tags of the context)."""
+        if self._spans is None:
+            return _NOOP
+        return self._record(name, args)
+
+    def tagged(self, track: Optional[str] = None, **tags: Any) -> AbstractContextManager[None]:
+        """
+        Puts the spans of the block (and of the tasks it creates) in `track`,
+        tagged with `tags`.
+        """
+        if self._spans is None:
+            return _NOOP
+        return _tagged(track, tags)
+
+    def export(self) -> dict[str, Any]:
+        """The spans as a Chrome trace (JSON object format)."""
+        spans = list(self._spans or ())
+        pid = os.getpid()
+        tracks: dict[str, int] = {}
+        events: list[dict[str, Any]] = []
+        for span in spans:
+            if span.track not in tracks:
+                tracks[span.track] = len(tracks) + 1
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": tracks[span.track],
+                        "args": {"name": span.track},
+                    }
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "megamek",
+                    "ph": "X",
+                    "ts": span.start,
+                    "dur": span.duration,
+                    "pid": pid,
+                    "tid": tracks[span.track],
+                    "args": span.args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    @contextmanager
+    def _record(self, name: str, args: dict[str, Any]) -> Iterator[None]:
+        track = _track.get()
+        args = {**_tags.get(), **args}
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            # Read again, in case tracing was turned off meanwhile.
+            if self._spans is not None:
+                self._spans.append(_Span(name, track, start // 1000, (end - start) // 1000, args))
+
+
+@contextmanager
+def _tagged(track: Optional[str], tags: dict[str, Any]) -> Iterator[None]:
+    track_token = _track.set(track) if track is not None else None
+    tags_token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(tags_token)
+        if track_token is not None:
+            _track.reset(track_token)
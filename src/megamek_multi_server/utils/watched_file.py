@@ -0,0 +1,142 @@
+import asyncio
+import os.path
+from typing import Callable, Generic, TypeVar
+
+from megamek_multi_server.utils.file_signature import Signature
+from megamek_multi_server.utils.inotify import (
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_MODIFY,
+    IN_MOVED_TO,
+    Inotify,
+)
+
+T = TypeVar("T")
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_CREATE | IN_MODIFY | IN_MOVED_TO
+# Time to wait after a change before reading, so writers can finish.
+_SETTLE_TIME = 0.2
+_POLL_INTERVAL = 5.0
+
+
+class WatchedFile(Generic[T]):
+    """
+    Parsed contents of a file that are reloaded in the background when it changes.
+
+    Changes are detected with inotify (watching the directory so files replaced
+    by renaming them are detected too) or by polling its signature if inotify is
+    not available. Reloads happen outside the event loop and the new value is
+    swapped in at once. If the new contents can't be parsed the last good value
+    is kept.
+    """
+
+    _path: str
+    _parse: Callable[[str], T]
+    _signature: Signature
+    _value: T
+    _listeners: list[Callable[[T], None]]
+    _inotify: Inotify | None
+    _names: dict[int, bytes]
+    _poll: asyncio.Task | None
+    _reloading: asyncio.Task | None
+    _dirty: bool
+
+    def __init__(self, path: str, parse: Callable[[str], T]) -> None:
+        self._path = path
+        self._parse = parse
+        self._signature, self._value = self._load()
+        self._listeners = []
+        self._inotify = None
+        self._names = {}
+        self._poll = None
+        self._reloading = None
+        self._dirty = False
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def value(self) -> T:
+        return self._value
+
+    def subscribe(self, listener: Callable[[T], None]) -> None:
+        """Calls `listener` with the new value after each successful reload."""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """Starts watching the file. Needs to be called within the event loop."""
+        try:
+            self._inotify = Inotify(self._on_event)
+            # The path may be a link to somewhere else, so both are watched.
+            for path in {self._path, os.path.realpath(self._path)}:
+                directory, name = os.path.split(os.path.abspath(path))
+                wd = self._inotify.add_watch(directory, _WATCH_MASK)
+                self._names[wd] = os.fsencode(name)
+        except OSError as e:
+            print(f"Can't watch {self._path}, polling it instead: {e}")
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            self._poll = asyncio.create_task(self._poll_forever())
+
+    async def close(self) -> None:
+        tasks = [t for t in (self._poll, self._reloading) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._poll = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def changed(self) -> None:
+        """Schedules a reload of the file."""
+        if self._reloading is not None:
+            self._dirty = True
+            return
+        self._reloading = asyncio.create_task(self._reload())
+
+    def _on_event(self, wd: int, _mask: int, name: bytes) -> None:
+        if self._names.get(wd) == name:
+            self.changed()
+
+    async def _poll_forever(self) -> None:
+        while True:
+            await asyncio.sleep(_POLL_INTERVAL)
+            try:
+                signature = await asyncio.to_thread(Signature.for_file, self._path)
+            except OSError:
+                continue
+            if signature != self._signature:
+                self.changed()
+
+    async def _reload(self) -> None:
+        try:
+            while True:
+                self._dirty = False
+                await asyncio.sleep(_SETTLE_TIME)
+                try:
+                    loaded = await asyncio.to_thread(self._load_if_changed)
+                except Exception as e:
+                    print(f"Could not reload {self._path}, keeping the last version: {e!r}")
+                else:
+                    if loaded is not None:
+                        self._value = loaded
+                        for listener in self._listeners:
+                            listener(loaded)
+                if not self._dirty:
+                    return
+        finally:
+            self._reloading = None
+
+    def _load_if_changed(self) -> T | None:
+        signature = Signature.for_file(self._path)
+        if signature == self._signature:
+            return None
+        # Even if it can't be parsed, it's not retried until it changes again.
+        self._signature = signature
+        return self._parse(self._path)
+
+    def _load(self) -> tuple[Signature, T]:
+        return Signature.for_file(self._path), self._parse(self._path)